@@ -0,0 +1,24 @@
+"""Standalone performance benchmarks.
+
+Every benchmark runs against its own SQLite database so it never touches
+``db.sqlite3``; see the module docstrings for how to run each one.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(database, **settings_overrides):
+    """Configure Django to use ``database`` and return its settings."""
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = database
+    for name, value in settings_overrides.items():
+        setattr(settings, name, value)
+    django.setup()
+    return settings
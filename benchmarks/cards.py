@@ -0,0 +1,105 @@
+"""Per-card render cost of a feed page: include loop vs ``post_cards``.
+
+    python -m benchmarks.cards [--repeat 200] [--per-page 10]
+
+A page of posts is rendered with the former ``{% include
+"include/post_item.html" %}`` loop and with the single-pass
+``{% post_cards %}`` tag, with the card cache cold (cleared before every
+render) and warm, for an anonymous reader and for the author of the
+posts. Both paths must produce the same HTML; the benchmark fails if
+they do not.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks import setup_django
+from benchmarks.urls import git_revision
+
+INCLUDE = (
+    '{% for post in page %}'
+    '{% include "include/post_item.html" with post=post %}{% endfor %}')
+SINGLE_PASS = (
+    '{% load post_cards %}{% post_cards page as cards %}'
+    '{% for card in cards %}{{ card }}{% endfor %}')
+
+
+def measure(template, context, cold, repeat):
+    from django.core.cache import cache
+    from django.template import Context
+
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        html = template.render(Context(context))
+        timings.append(time.perf_counter() - started)
+    return html, statistics.median(timings)
+
+
+def run(options):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.template import Template
+
+    from benchmarks.dataset import seed
+    from posts.models import Post
+
+    call_command('migrate', verbosity=0)
+    seed(users=10, groups=3, posts=options.posts, comments=options.posts,
+         follows=10)
+    author = get_user_model().objects.order_by('pk').first()
+    page = list(Post.objects.for_cards().filter(author=author).order_by(
+        '-pub_date')[:options.per_page])
+    templates = {
+        'include': Template(INCLUDE), 'post_cards': Template(SINGLE_PASS)}
+    runs = []
+    for viewer, user in (('anonymous', None), ('author', author)):
+        for cold in (True, False):
+            context = {'page': page, 'user': user}
+            rendered = {}
+            run = {'viewer': viewer, 'cache': 'cold' if cold else 'warm'}
+            for name, template in templates.items():
+                rendered[name], seconds = measure(
+                    template, context, cold, options.repeat)
+                run[f'{name}_us_per_card'] = seconds / len(page) * 1e6
+            if rendered['include'] != rendered['post_cards']:
+                raise AssertionError(f'HTML differs: {run}')
+            runs.append(run)
+    return {'revision': git_revision(), 'cards': len(page), 'runs': runs}
+
+
+def report(results):
+    print(f'{results["revision"]}, карточек на странице: {results["cards"]}')
+    for run in results['runs']:
+        before = run['include_us_per_card']
+        after = run['post_cards_us_per_card']
+        print(f'{run["viewer"]:>9}, кэш {run["cache"]}: '
+              f'{before:7.1f} мкс -> {after:7.1f} мкс на карточку '
+              f'({before / after:.2f}x)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--output', help='Сохранить результаты в JSON')
+    options = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(
+            os.path.join(directory, 'bench.sqlite3'), DEBUG=False,
+            MEDIA_ROOT=directory, THUMBNAIL_WORKERS=0)
+        results = run(options)
+    report(results)
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""Read/write throughput of N parallel workers per database profile.
+
+Run from the repository root:
+
+    python -m benchmarks.concurrency [--workers 1 4 8] [--duration 10]
+        [--write-ratio 0.2] [--profiles development production]
+
+Every worker is a separate process with its own Django, as under a
+pre-forking server. It mixes ``GET /`` with comments posted to a handful
+of hot posts until the time is up. For each profile and worker count the
+benchmark reports reads and writes per second, their latencies and the
+requests that failed, e.g. on "database is locked". Each run starts from
+a fresh copy of the same seeded database.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks import setup_django
+from benchmarks.urls import git_revision, percentile
+
+# Comments go to this many of the newest posts, so writers contend.
+HOT_POSTS = 5
+# Workers start together this long after the pool is created, when their
+# Django is set up.
+START_DELAY = 5
+
+
+def _configure(database, media, profile):
+    os.environ['YATUBE_DB_PROFILE'] = profile
+    os.environ['YATUBE_METRICS_SAMPLE_RATE'] = '0'
+    setup_django(
+        database, DEBUG=False, MEDIA_ROOT=media, THUMBNAIL_WORKERS=0,
+        ALLOWED_HOSTS=['*'])
+
+
+def _worker(database, media, profile, worker, start_at, duration,
+            write_ratio):
+    _configure(database, media, profile)
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+
+    from posts.models import Post
+
+    User = get_user_model()
+    user = User.objects.order_by('pk')[worker]
+    posts = list(Post.objects.order_by('-pub_date').values_list(
+        'author__username', 'pk')[:HOT_POSTS])
+    client = Client()
+    client.force_login(user)
+    connection.close()
+    random.seed(worker)
+    timings = {'read': [], 'write': []}
+    errors = 0
+    time.sleep(max(0, start_at - time.time()))
+    deadline = start_at + duration
+    while time.time() < deadline:
+        started = time.perf_counter()
+        kind = 'write' if random.random() < write_ratio else 'read'
+        try:
+            if kind == 'write':
+                username, post_id = random.choice(posts)
+                response = client.post(
+                    f'/{username}/{post_id}/comment/',
+                    {'text': f'Комментарий {worker}'})
+                ok = response.status_code == 302
+            else:
+                ok = client.get('/').status_code == 200
+        except Exception:
+            # The test client re-raises what a view raised, e.g.
+            # "database is locked"; a server would answer 500.
+            ok = False
+        elapsed = (time.perf_counter() - started) * 1000
+        if ok:
+            timings[kind].append(elapsed)
+        else:
+            errors += 1
+    return timings, errors
+
+
+def _seed(database, media, options):
+    _configure(database, media, 'development')
+    from django.core.management import call_command
+    from django.db import connection
+
+    from benchmarks.dataset import seed
+
+    call_command('migrate', verbosity=0)
+    dataset = seed(
+        users=max(options.users, max(options.workers)),
+        groups=options.groups, posts=options.posts,
+        comments=options.comments, follows=options.follows)
+    connection.close()
+    return dataset
+
+
+def measure(base, media, profile, workers, options):
+    database = f'{base}.{profile}.{workers}'
+    shutil.copyfile(base, database)
+    context = multiprocessing.get_context('spawn')
+    start_at = time.time() + START_DELAY
+    with context.Pool(workers) as pool:
+        results = pool.starmap(_worker, [
+            (database, media, profile, worker, start_at, options.duration,
+             options.write_ratio)
+            for worker in range(workers)])
+    reads = [value for timings, _ in results for value in timings['read']]
+    writes = [value for timings, _ in results for value in timings['write']]
+    result = {
+        'profile': profile,
+        'workers': workers,
+        'reads_per_s': len(reads) / options.duration,
+        'writes_per_s': len(writes) / options.duration,
+        'errors': sum(errors for _, errors in results),
+    }
+    for kind, values in (('read', reads), ('write', writes)):
+        for percent in (50, 95):
+            result[f'{kind}_p{percent}_ms'] = (
+                percentile(values, percent) if values else None)
+    return result
+
+
+def report(results):
+    print(f'{results["revision"]}, {results["duration"]} с на запуск, '
+          f'доля записей {results["write_ratio"]:.0%}')
+    for run in results['runs']:
+        latencies = ', '.join(
+            f'{field} {run[field]:.1f}' for field in (
+                'read_p50_ms', 'read_p95_ms', 'write_p50_ms', 'write_p95_ms')
+            if run[field] is not None)
+        print(f'{run["profile"]:>11} x{run["workers"]:<3} '
+              f'чтений/с {run["reads_per_s"]:7.1f}, '
+              f'записей/с {run["writes_per_s"]:6.1f}, '
+              f'ошибок {run["errors"]}; {latencies}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--follows', type=int, default=5000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument(
+        '--duration', type=float, default=10,
+        help='Секунд нагрузки на каждый запуск')
+    parser.add_argument(
+        '--write-ratio', type=float, default=0.2,
+        help='Доля запросов, добавляющих комментарий')
+    parser.add_argument(
+        '--profiles', nargs='+', default=['development', 'production'])
+    parser.add_argument('--output', help='Сохранить результаты в JSON')
+    options = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        base = os.path.join(directory, 'bench.sqlite3')
+        dataset = _seed(base, directory, options)
+        runs = [
+            measure(base, directory, profile, workers, options)
+            for profile in options.profiles
+            for workers in options.workers]
+    results = {
+        'revision': git_revision(),
+        'dataset': dataset,
+        'duration': options.duration,
+        'write_ratio': options.write_ratio,
+        'runs': runs,
+    }
+    report(results)
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Synthetic dataset for the benchmarks.
+
+Rows are written with raw ``executemany`` batches, which is what makes
+seeding millions of posts practical; call ``setup_django`` first.
+"""
+import datetime
+import io
+import os
+import random
+
+BATCH_SIZE = 10000
+
+
+def _insert(cursor, table, columns, rows):
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        table, ', '.join(columns), ', '.join(['%s'] * len(columns)))
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+
+
+def _timestamp(start, offset):
+    return (start + datetime.timedelta(seconds=offset)).strftime(
+        '%Y-%m-%d %H:%M:%S.%f')
+
+
+def _images(count):
+    from django.conf import settings
+    from PIL import Image
+
+    directory = os.path.join(settings.MEDIA_ROOT, 'posts')
+    os.makedirs(directory, exist_ok=True)
+    names = []
+    for i in range(count):
+        name = f'posts/bench_{i}.jpg'
+        buffer = io.BytesIO()
+        Image.new(
+            'RGB', (1600, 1200), color=(i * 37 % 256, 80, 160)
+        ).save(buffer, 'JPEG')
+        with open(os.path.join(settings.MEDIA_ROOT, name), 'wb') as file:
+            file.write(buffer.getvalue())
+        names.append(name)
+    return names
+
+
+def seed(users=1000, groups=20, posts=10000, comments=20000,
+         follows=5000, images=0, random_seed=0, derived=True):
+    """Fill an empty, migrated database and return the row counts.
+
+    With ``derived`` the counters, follow timelines and search index are
+    rebuilt afterwards, as the site itself would have maintained them.
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.core.management import call_command
+    from django.db import connection, transaction
+
+    rng = random.Random(random_seed)
+    start = datetime.datetime(2021, 1, 1)
+    password = make_password('benchmark')
+    image_names = _images(images)
+    with transaction.atomic(), connection.cursor() as cursor:
+        _insert(
+            cursor, 'auth_user',
+            ['username', 'password', 'first_name', 'last_name', 'email',
+             'is_superuser', 'is_staff', 'is_active', 'date_joined'],
+            ((f'user{i}', password, '', '', '', False, False, True,
+              _timestamp(start, 0)) for i in range(1, users + 1)))
+        _insert(
+            cursor, 'posts_group', ['title', 'slug', 'description'],
+            ((f'Группа {i}', f'group{i}', f'Описание группы {i}')
+             for i in range(1, groups + 1)))
+        _insert(
+            cursor, 'posts_post',
+            ['text', 'pub_date', 'author_id', 'group_id', 'image',
+             'comment_count', 'version'],
+            ((f'Пост {i} ' + 'текст ' * rng.randint(5, 50),
+              _timestamp(start, i), rng.randint(1, users),
+              rng.randint(1, groups) if groups and rng.random() < 0.7
+              else None,
+              image_names[i % len(image_names)] if image_names else '',
+              0, 0)
+             for i in range(1, posts + 1)))
+        _insert(
+            cursor, 'posts_comment',
+            ['post_id', 'author_id', 'text', 'created'],
+            ((rng.randint(1, posts), rng.randint(1, users), f'Комментарий {i}',
+              _timestamp(start, posts + i))
+             for i in range(1, comments + 1)))
+        pairs = set()
+        while len(pairs) < min(follows, users * (users - 1)):
+            user, author = rng.randint(1, users), rng.randint(1, users)
+            if user != author:
+                pairs.add((user, author))
+        _insert(
+            cursor, 'posts_follow', ['user_id', 'author_id'], sorted(pairs))
+    if derived:
+        call_command('reconcile_counters', stdout=io.StringIO())
+        call_command('rebuild_timelines', stdout=io.StringIO())
+        call_command('rebuild_search_index', stdout=io.StringIO())
+    return {
+        'users': users, 'groups': groups, 'posts': posts,
+        'comments': comments, 'follows': len(pairs), 'images': images,
+    }
@@ -0,0 +1,112 @@
+"""Query plans and latency of the feed queries before and after the
+composite indexes of ``posts.0013_feed_indexes``.
+
+    python -m benchmarks.indexes --posts 1000000 --output indexes.json
+
+The database is seeded once at migration 0012, measured, migrated to
+0013 and measured again.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks import setup_django
+
+BEFORE, AFTER = '0012_post_version', '0013_feed_indexes'
+
+
+def feed_queries():
+    from django.db.models import Q
+
+    from posts.models import Comment, Follow, Post
+
+    newest = Post.objects.order_by('-pub_date', '-id')
+    middle = newest.values('pub_date', 'id')[Post.objects.count() // 2]
+    deep = Q(pub_date__lte=middle['pub_date']) & (
+        Q(pub_date__lt=middle['pub_date']) | Q(id__lt=middle['id']))
+    post = Comment.objects.values('post_id').first()['post_id']
+    follow = Follow.objects.values('user_id', 'author_id').first()
+    return {
+        'index': newest.for_cards()[:11],
+        'index, deep cursor': newest.for_cards().filter(deep)[:11],
+        'group': newest.for_cards().filter(group_id=1)[:11],
+        'group, deep cursor': newest.for_cards().filter(
+            deep, group_id=1)[:11],
+        'profile': newest.for_cards().filter(author_id=1)[:11],
+        'post comments': Comment.objects.select_related('author').filter(
+            post_id=post).order_by('-created', '-id'),
+        'follow lookup': Follow.objects.filter(
+            user_id=follow['user_id'], author_id=follow['author_id']),
+        'followers of author': Follow.objects.filter(
+            author_id=follow['author_id']).values('user_id'),
+    }
+
+
+def measure(queryset, repeat):
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        plan = [row[-1] for row in cursor.fetchall()]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+    return {'plan': plan, 'median_ms': statistics.median(timings)}
+
+
+def run(options):
+    from django.core.management import call_command
+
+    from benchmarks.dataset import seed
+
+    call_command('migrate', verbosity=0)
+    call_command('migrate', 'posts', BEFORE, verbosity=0)
+    dataset = seed(
+        users=options.users, groups=options.groups, posts=options.posts,
+        comments=options.comments, follows=options.follows, derived=False)
+    results = {'dataset': dataset}
+    for label, migration in (('before', BEFORE), ('after', AFTER)):
+        call_command('migrate', 'posts', migration, verbosity=0)
+        results[label] = {
+            name: measure(queryset, options.repeat)
+            for name, queryset in feed_queries().items()}
+    return results
+
+
+def report(results):
+    for name, before in results['before'].items():
+        after = results['after'][name]
+        print(f'{name}: {before["median_ms"]:.2f} ms -> '
+              f'{after["median_ms"]:.2f} ms')
+        print('    before: ' + '; '.join(before['plan']))
+        print('    after:  ' + '; '.join(after['plan']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--groups', type=int, default=100)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--comments', type=int, default=1000000)
+    parser.add_argument('--follows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help='Сохранить результаты в JSON')
+    options = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'bench.sqlite3'))
+        results = run(options)
+    report(results)
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
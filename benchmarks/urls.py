@@ -0,0 +1,301 @@
+"""Latency, queries and memory of every URL of the site.
+
+    python -m benchmarks.urls --posts 100000 --output before.json
+    python -m benchmarks.urls --posts 100000 --compare before.json
+
+Each route is requested through the Django test client against a
+freshly seeded database: ``--repeat`` timed requests, then one request
+with a query-counting execute wrapper and one under ``tracemalloc``, so that
+neither instrument skews the timings. Routes without an entry in
+``ROUTES`` are listed as skipped, so new URLs do not go unnoticed.
+"""
+import argparse
+import collections
+import io
+import json
+import os
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import BASE_DIR, setup_django
+
+Route = collections.namedtuple(
+    'Route', 'user kwargs method data query prepare',
+    defaults=(None, None, 'get', None, None, None))
+
+
+def _unfollow(objects):
+    from posts.models import Follow
+
+    Follow.objects.filter(
+        user=objects['reader'], author=objects['other']).delete()
+
+
+def _follow(objects):
+    from posts.models import Follow
+
+    Follow.objects.get_or_create(
+        user=objects['reader'], author=objects['other'])
+
+
+def _author(objects):
+    return {'username': objects['author'].username}
+
+
+def _post(objects):
+    return {'username': objects['author'].username,
+            'post_id': objects['post'].pk}
+
+
+ROUTES = {
+    'posts:index': Route(),
+    'posts:group': Route(kwargs=lambda objects: {
+        'slug': objects['group'].slug}),
+    'posts:new_post': Route(user='author'),
+    'posts:follow_index': Route(user='reader'),
+    'posts:search': Route(query={'q': 'текст'}),
+    'posts:profile': Route(kwargs=_author),
+    'posts:post': Route(kwargs=_post),
+    'posts:post_edit': Route(user='author', kwargs=_post),
+    'posts:comments': Route(kwargs=_post),
+    'posts:add_comment': Route(
+        user='reader', kwargs=_post, method='post',
+        data={'text': 'Комментарий из бенчмарка'}),
+    'posts:profile_follow': Route(
+        user='reader', prepare=_unfollow, kwargs=lambda objects: {
+            'username': objects['other'].username}),
+    'posts:profile_unfollow': Route(
+        user='reader', prepare=_follow, kwargs=lambda objects: {
+            'username': objects['other'].username}),
+    'posts:archive': Route(user='author'),
+    'posts:api_index': Route(),
+    'posts:api_group': Route(kwargs=lambda objects: {
+        'slug': objects['group'].slug}),
+    'posts:api_follow_index': Route(user='reader'),
+    'posts:api_profile': Route(kwargs=_author),
+    'posts:api_post': Route(kwargs=_post),
+    'about:author': Route(),
+    'about:tech': Route(),
+    'signup': Route(),
+    'login': Route(),
+    'password_reset': Route(),
+    'password_reset_done': Route(),
+    'password_change': Route(user='reader'),
+    'password_change_done': Route(user='reader'),
+    'admin:index': Route(user='admin'),
+    'admin:posts_post_changelist': Route(user='admin'),
+}
+
+
+def url_names(patterns=None, namespace=''):
+    """Names of every named URL, ``namespace:name`` where namespaced."""
+    from django.urls import URLResolver, get_resolver
+
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    names = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = namespace
+            if pattern.namespace:
+                prefix = f'{namespace}{pattern.namespace}:'
+            names.extend(url_names(pattern.url_patterns, prefix))
+        elif pattern.name:
+            names.append(namespace + pattern.name)
+    return list(dict.fromkeys(names))
+
+
+def sample_objects():
+    from django.contrib.auth import get_user_model
+    from django.db.models import Count
+
+    from posts.models import Follow, Group
+
+    User = get_user_model()
+    reader = User.objects.get(pk=Follow.objects.values_list(
+        'user_id', flat=True).first())
+    author = User.objects.annotate(
+        posts_count=Count('posts')).order_by('-posts_count').first()
+    other = User.objects.exclude(pk__in=[reader.pk, author.pk]).first()
+    admin = User.objects.create_superuser(
+        'benchmark_admin', 'admin@example.com', 'benchmark')
+    return {
+        'reader': reader,
+        'author': author,
+        'other': other,
+        'admin': admin,
+        'group': Group.objects.first(),
+        'post': author.posts.annotate(
+            comments_total=Count('comments')
+        ).order_by('-comments_total').first(),
+    }
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    rank = max(0, round(percent / 100 * len(ordered) + 0.5) - 1)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def measure(name, route, objects, options):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    client = Client()
+    if route.user:
+        client.force_login(objects[route.user])
+    url = reverse(name, kwargs=route.kwargs(objects) if route.kwargs else None)
+    request = getattr(client, route.method)
+    data = route.data or route.query
+
+    def call():
+        if route.prepare:
+            route.prepare(objects)
+        if options.cold:
+            cache.clear()
+        started = time.perf_counter()
+        response = request(url, data)
+        if response.streaming:
+            # Measure the whole body, not just the headers.
+            for _ in response.streaming_content:
+                pass
+        return response, (time.perf_counter() - started) * 1000
+
+    for _ in range(options.warmup):
+        call()
+    timings = [call()[1] for _ in range(options.repeat)]
+    queries = []
+    # The test client resets connection.queries on request_started, so
+    # queries are counted by a wrapper instead.
+    with connection.execute_wrapper(
+            lambda execute, sql, *args: queries.append(sql) or execute(
+                sql, *args)):
+        response, _ = call()
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'url': url,
+        'method': route.method.upper(),
+        'status': response.status_code,
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'p99_ms': percentile(timings, 99),
+        'queries': len(queries),
+        'peak_alloc_kb': peak / 1024,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    from django.conf import settings
+    from django.core.management import call_command
+
+    from benchmarks.dataset import seed
+
+    call_command('migrate', verbosity=0)
+    dataset = seed(
+        users=options.users, groups=options.groups, posts=options.posts,
+        comments=options.comments, follows=options.follows,
+        images=options.images)
+    if options.images:
+        call_command('warm_thumbnails', workers=1, stdout=io.StringIO())
+    objects = sample_objects()
+    names = url_names()
+    routes = {}
+    for name in names:
+        if name in ROUTES and (not options.only or name in options.only):
+            routes[name] = measure(name, ROUTES[name], objects, options)
+    return {
+        'revision': git_revision(),
+        'cache': settings.CACHES['default']['BACKEND'],
+        'dataset': dataset,
+        'repeat': options.repeat,
+        'cold_cache': options.cold,
+        'routes': routes,
+        'skipped': [
+            name for name in names
+            if name not in ROUTES and not name.startswith('admin:')],
+        'max_rss_mb': resource.getrusage(
+            resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _change(before, after):
+    if not before:
+        return ''
+    return f' ({(after - before) / before:+.0%})'
+
+
+def report(results, baseline=None):
+    baseline_routes = baseline['routes'] if baseline else {}
+    print(f'{results["revision"]}, {results["cache"]}, '
+          f'max RSS {results["max_rss_mb"]:.0f} MB')
+    for name, result in results['routes'].items():
+        before = baseline_routes.get(name, {})
+        print(f'{name}: {result["method"]} {result["url"]} '
+              f'{result["status"]}')
+        print('    ' + ', '.join(
+            f'{field} {result[field]:.1f}'
+            f'{_change(before.get(field), result[field])}'
+            for field in ('p50_ms', 'p95_ms', 'p99_ms', 'queries',
+                          'peak_alloc_kb')))
+    if results['skipped']:
+        print('Без бенчмарка: ' + ', '.join(results['skipped']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--follows', type=int, default=5000)
+    parser.add_argument('--images', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument(
+        '--cold', action='store_true',
+        help='Очищать кэш перед каждым запросом')
+    parser.add_argument(
+        '--cache', help='Бэкенд кэша из CACHE_BACKENDS в настройках')
+    parser.add_argument(
+        '--only', nargs='*', help='Измерить только эти имена URL')
+    parser.add_argument('--output', help='Сохранить результаты в JSON')
+    parser.add_argument(
+        '--compare', help='JSON прошлого запуска для сравнения')
+    options = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        overrides = {'DEBUG': False, 'MEDIA_ROOT': directory}
+        settings = setup_django(
+            os.path.join(directory, 'bench.sqlite3'), **overrides)
+        if options.cache:
+            settings.CACHES = {
+                'default': settings.CACHE_BACKENDS[options.cache]}
+        results = run(options)
+    baseline = None
+    if options.compare:
+        with open(options.compare) as file:
+            baseline = json.load(file)
+    report(results, baseline)
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
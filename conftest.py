@@ -0,0 +1 @@
+pytest_plugins = ['posts.tests.query_budget']
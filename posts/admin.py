@@ -1,16 +1,36 @@
+from django.conf import settings
 from django.contrib import admin
 
 from .models import Group, Post, Follow, Comment
+from .search import GROUP, POST, search_ids
 
 
-class PostAdmin(admin.ModelAdmin):
+class IndexedSearchMixin:
+    """Admin search through the site search index.
+
+    Like the site search, it shows at most ``SEARCH_MAX_RESULTS`` best
+    matches.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=search_ids(
+            self.search_kind, search_term, settings.SEARCH_MAX_RESULTS)
+        ), False
+
+
+class PostAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = POST
     list_display = ('pk', 'text', 'pub_date', 'author')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = GROUP
     list_display = ('title', 'slug', 'description')
     search_fields = ('title', 'description')
     empty_value_display = '-пусто-'
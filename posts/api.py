@@ -0,0 +1,259 @@
+"""Read-only JSON API of the feeds and posts.
+
+The API pages the same querysets as the HTML views, comments of a post
+included, with ``CursorPaginator``, but reads them through ``values()``
+so that no model instances or templates are involved. ``?fields=``
+narrows both the payload and the selected columns. Responses are compact
+JSON, compressed with brotli or gzip when the client accepts it, and
+carry the ETag of the matching page.
+
+The ETag changes whenever the page does, so a body is also cached under
+it: a repeat request for an unchanged page costs the validators query
+and one cache read, whoever sent it first.
+"""
+import hashlib
+import json
+import re
+from functools import partial, wraps
+
+import brotli
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+from yatube.staticfiles import accepted_encodings
+
+from .freshness import (conditional, follow_validators, group_validators,
+                        index_validators, post_validators, profile_validators)
+from .models import Comment, Group, Post
+from .paginator import COMMENTS_PER_PAGE, POSTS_PER_PAGE, CursorPaginator
+from .timeline import FollowFeedPaginator, follow_feed
+
+User = get_user_model()
+
+# Public field name: column of the values() query.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comment_count': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _image_url(name):
+    return default_storage.url(name) if name else None
+
+
+CONVERTERS = {
+    'pub_date': _isoformat,
+    'created': _isoformat,
+    'image': _image_url,
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+        content_type='application/json', status=status)
+
+
+def compress_page(view):
+    """``gzip_page`` that prefers brotli when the client accepts it."""
+    gzipped = gzip_page(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if 'br' not in accepted_encodings(
+                request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return gzipped(request, *args, **kwargs)
+        response = view(request, *args, **kwargs)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        # As in GZipMiddleware: not worth it below 200 bytes.
+        if (response.streaming or len(response.content) < 200
+                or response.has_header('Content-Encoding')):
+            return response
+        compressed = brotli.compress(
+            response.content, quality=settings.API_BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+        response['Content-Encoding'] = 'br'
+        return response
+    return wrapper
+
+
+def api_view(view):
+    """GET only, compressed, with 400 for ``BadRequest``."""
+    @compress_page
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as error:
+            return json_response({'detail': str(error)}, 400)
+    return wrapper
+
+
+def cached_body(view):
+    """Serve the body of a page from the cache while its ETag holds.
+
+    Goes inside ``conditional``, whose validators it reads.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        validators = request.validators
+        if validators is None:
+            return view(request, *args, **kwargs)
+        key = 'api:' + hashlib.md5(
+            f'{validators.etag}|{request.get_full_path()}'.encode()
+        ).hexdigest()
+        body = cache.get(key)
+        if body is not None:
+            return HttpResponse(body, content_type='application/json')
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.content, settings.API_CACHE_TIMEOUT)
+        return response
+    return wrapper
+
+
+def not_found():
+    return json_response({'detail': 'Не найдено'}, 404)
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return json_response({'detail': 'Нужно войти'}, 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def requested_fields(request):
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(POST_FIELDS)
+    fields = list(dict.fromkeys(
+        name.strip() for name in requested.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in POST_FIELDS]
+    if unknown or not fields:
+        raise BadRequest(
+            'Неизвестные поля: {}; доступны: {}'.format(
+                ', '.join(unknown), ', '.join(POST_FIELDS)))
+    return fields
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', POSTS_PER_PAGE))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return max(1, min(size, settings.API_MAX_PAGE_SIZE))
+
+
+def serialize(rows, fields, columns):
+    getters = [
+        (name, columns[name], CONVERTERS.get(name)) for name in fields]
+    return [
+        {name: convert(row[column]) if convert and row[column] is not None
+         else row[column] for name, column, convert in getters}
+        for row in rows]
+
+
+def feed_response(request, queryset, paginator_class=CursorPaginator):
+    fields = requested_fields(request)
+    columns = {POST_FIELDS[name] for name in fields} | {'id', 'pub_date'}
+    page = paginator_class(
+        queryset.values(*columns), page_size(request)
+    ).get_page(request.GET.get('cursor'))
+    return json_response({
+        'results': serialize(page, fields, POST_FIELDS),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@api_view
+@conditional(index_validators)
+@cached_body
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@api_view
+@conditional(group_validators)
+@cached_body
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return not_found()
+    return feed_response(request, group.posts.all())
+
+
+@api_view
+@conditional(profile_validators)
+@cached_body
+def profile(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return not_found()
+    return feed_response(request, author.posts.all())
+
+
+@api_view
+@login_required
+@conditional(follow_validators)
+@cached_body
+def follow_index(request):
+    return feed_response(
+        request, follow_feed(request.user),
+        partial(FollowFeedPaginator, request.user))
+
+
+@api_view
+@conditional(post_validators)
+@cached_body
+def post_view(request, username, post_id):
+    fields = requested_fields(request)
+    post = Post.objects.filter(
+        pk=post_id, author__username=username
+    ).values(*{POST_FIELDS[name] for name in fields}).first()
+    if post is None:
+        return not_found()
+    comments = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).values(
+            *COMMENT_FIELDS.values()),
+        COMMENTS_PER_PAGE, 'created'
+    ).get_page(request.GET.get('cursor'))
+    return json_response({
+        'post': serialize([post], fields, POST_FIELDS)[0],
+        'comments': serialize(comments, COMMENT_FIELDS, COMMENT_FIELDS),
+        'next': comments.next_cursor,
+        'previous': comments.previous_cursor,
+    })
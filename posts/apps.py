@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from yatube.sqlite import apply_pragmas
+
+        from . import signals  # noqa: F401
+
+        connection_created.connect(
+            apply_pragmas, dispatch_uid='yatube.sqlite.apply_pragmas')
@@ -0,0 +1,89 @@
+"""Zip archive of everything a user has written, built while it is sent.
+
+``zipfile`` can write to a stream it cannot seek: every entry is followed
+by a data descriptor instead of a patched header. ``archive`` hands it a
+pipe that only collects the bytes written so far and yields them after
+each step, so the response never holds more than one chunk of a file.
+"""
+import json
+import zipfile
+
+from django.utils import timezone
+
+from .models import Comment, Post
+from .transfer import export_rows
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _Pipe:
+    """Write-only file whose contents are taken out with ``drain``."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _entry(name, compress):
+    info = zipfile.ZipInfo(name, timezone.localtime().timetuple()[:6])
+    info.compress_type = (
+        zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED)
+    return info
+
+
+def _ndjson(rows):
+    for row in rows:
+        yield (json.dumps(row, ensure_ascii=False) + '\n').encode()
+
+
+def _chunks(file):
+    with file:
+        yield from iter(lambda: file.read(CHUNK_SIZE), b'')
+
+
+def archive(user):
+    """Yield the bytes of a zip with the posts, comments and images of
+    ``user``."""
+    pipe = _Pipe()
+    posts = Post.objects.filter(author=user)
+    images = posts.exclude(image='').values_list(
+        'image', flat=True).order_by('image').distinct()
+    entries = [
+        ('posts.ndjson', True, _ndjson(export_rows('posts', posts))),
+        ('comments.ndjson', True, _ndjson(export_rows(
+            'comments', Comment.objects.filter(author=user)))),
+    ]
+    with zipfile.ZipFile(pipe, 'w', allowZip64=True) as zip_file:
+        for name, compress, chunks in entries:
+            yield from _write(zip_file, pipe, _entry(name, compress), chunks)
+        for image in images.iterator():
+            try:
+                file = Post.image.field.storage.open(image)
+            except OSError:
+                continue
+            yield from _write(
+                zip_file, pipe, _entry(image, False), _chunks(file))
+    yield pipe.drain()
+
+
+def _write(zip_file, pipe, info, chunks):
+    with zip_file.open(info, 'w', force_zip64=True) as entry:
+        for chunk in chunks:
+            entry.write(chunk)
+            data = pipe.drain()
+            if data:
+                yield data
+    data = pipe.drain()
+    if data:
+        yield data
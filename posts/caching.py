@@ -0,0 +1,194 @@
+"""Cache helpers for feed fragments.
+
+``get_or_compute`` protects hot keys against stampedes with probabilistic
+early expiration (XFetch): each reader may decide to refresh a value
+shortly before it expires, with a probability that grows as expiry
+approaches and with the cost of recomputing it. The refresh is guarded by
+a short lock, so while one worker recomputes the others keep serving the
+current value. A miss takes the same lock: the other workers wait up to
+``CACHE_MISS_WAIT`` seconds for the value instead of all computing it.
+Hits and misses are counted per key prefix.
+"""
+import math
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+STATS_KEY = 'cache_stats'
+EVENTS = ('hit', 'miss', 'early')
+LOCK_TIMEOUT = 10
+# Seconds between two looks for a value another worker is computing.
+WAIT_INTERVAL = 0.02
+
+HIT, COMPUTE, WAIT = 'hit', 'compute', 'wait'
+
+_lock = threading.Lock()
+_stats = Counter()
+_last_flush = time.monotonic()
+_collected = ContextVar('cache_events', default=None)
+
+
+def key_prefix(key):
+    return key.split(':', 1)[0]
+
+
+def record(key, event):
+    """Count a ``hit``, ``miss`` or ``early`` refresh of ``key``."""
+    global _last_flush
+    events = _collected.get()
+    if events is not None:
+        events[event] += 1
+    with _lock:
+        _stats[(key_prefix(key), event)] += 1
+        if time.monotonic() - _last_flush < (
+                settings.CACHE_STATS_FLUSH_INTERVAL):
+            return
+        pending = dict(_stats)
+        _stats.clear()
+        _last_flush = time.monotonic()
+    _flush(pending)
+
+
+def _counter_key(prefix, event):
+    return f'{STATS_KEY}:{prefix}:{event}'
+
+
+def _register(prefix):
+    # Each prefix gets a numbered slot once; add() and incr() are atomic,
+    # so concurrent workers never overwrite each other's prefixes.
+    if cache.add(f'{STATS_KEY}:known:{prefix}', 1, None):
+        cache.add(f'{STATS_KEY}:prefixes', 0, None)
+        slot = cache.incr(f'{STATS_KEY}:prefixes')
+        cache.set(f'{STATS_KEY}:prefix:{slot}', prefix, None)
+
+
+def _flush(pending):
+    for prefix in {prefix for prefix, _ in pending}:
+        _register(prefix)
+    for (prefix, event), count in pending.items():
+        key = _counter_key(prefix, event)
+        cache.add(key, 0, None)
+        cache.incr(key, count)
+
+
+@contextmanager
+def collect_events():
+    """Count the events recorded inside the block, e.g. of one request."""
+    events = Counter()
+    token = _collected.set(events)
+    try:
+        yield events
+    finally:
+        _collected.reset(token)
+
+
+def local_stats():
+    """Counters of this process that have not been flushed yet."""
+    with _lock:
+        return dict(_stats)
+
+
+def shared_stats():
+    """Counters flushed by every worker, keyed by ``(prefix, event)``."""
+    with _lock:
+        pending = dict(_stats)
+        _stats.clear()
+    if pending:
+        _flush(pending)
+    slots = cache.get(f'{STATS_KEY}:prefixes') or 0
+    prefixes = cache.get_many([
+        f'{STATS_KEY}:prefix:{slot}' for slot in range(1, slots + 1)])
+    known = sorted(
+        (prefix, event) for prefix in set(prefixes.values())
+        for event in EVENTS)
+    values = cache.get_many([_counter_key(*pair) for pair in known])
+    return {
+        pair: values.get(_counter_key(*pair), 0) for pair in known}
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _decide(key, entry, beta):
+    """``HIT`` to serve ``entry``, ``COMPUTE`` under the lock or ``WAIT``."""
+    if entry is None:
+        record(key, 'miss')
+        return COMPUTE if cache.add(_lock_key(key), 1, LOCK_TIMEOUT) else WAIT
+    value, delta, expires = entry
+    early = time.time() - delta * beta * math.log(1 - random.random())
+    if early < expires or not cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+        record(key, 'hit')
+        return HIT
+    record(key, 'early')
+    return COMPUTE
+
+
+def _await(keys):
+    """The entries of ``keys`` other workers set within the wait."""
+    deadline = time.monotonic() + settings.CACHE_MISS_WAIT
+    found = {}
+    keys = list(keys)
+    while keys and time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entries = cache.get_many(keys)
+        found.update(entries)
+        keys = [key for key in keys if key not in entries]
+    return found
+
+
+def _compute(compute, timeout):
+    started = time.time()
+    value = compute()
+    delta = time.time() - started
+    return value, (value, delta, time.time() + timeout)
+
+
+def get_or_compute(key, compute, timeout, beta=1.0):
+    entry = cache.get(key)
+    action = _decide(key, entry, beta)
+    if action == WAIT:
+        entry = _await([key]).get(key)
+        action = HIT if entry is not None else WAIT
+    if action == HIT:
+        return entry[0]
+    # After a vain wait the value is computed without the lock.
+    value, fresh = _compute(compute, timeout)
+    cache.set(key, fresh, timeout)
+    if action == COMPUTE:
+        cache.delete(_lock_key(key))
+    return value
+
+
+def get_many_or_compute(computations, timeout, beta=1.0):
+    """``get_or_compute`` for every ``key: compute`` pair at once.
+
+    The entries are read with one ``get_many`` and the recomputed ones
+    written back with one ``set_many``.
+    """
+    entries = cache.get_many(list(computations))
+    actions = {
+        key: _decide(key, entries.get(key), beta) for key in computations}
+    waiting = [key for key, action in actions.items() if action == WAIT]
+    if waiting:
+        entries.update(_await(waiting))
+    values = {}
+    fresh = {}
+    for key, compute in computations.items():
+        if actions[key] == HIT or (
+                actions[key] == WAIT and key in entries):
+            values[key] = entries[key][0]
+        else:
+            values[key], fresh[key] = _compute(compute, timeout)
+    if fresh:
+        cache.set_many(fresh, timeout)
+        locked = [key for key, action in actions.items() if action == COMPUTE]
+        if locked:
+            cache.delete_many([_lock_key(key) for key in locked])
+    return values
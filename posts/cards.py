@@ -0,0 +1,56 @@
+from functools import partial
+
+from django.conf import settings
+from django.db.models import F
+from django.template.loader import get_template
+
+from .caching import get_many_or_compute
+
+ACTIONS_MARKER = '<!-- post-card-actions -->'
+
+
+def card_key(post, using=None):
+    key = 'post_card:{}:{}:{}'.format(
+        post.pk, post.version, int(post.pub_date.timestamp() * 1000000))
+    # Each engine caches the cards rendered from its own templates.
+    return f'{key}:{using}' if using else key
+
+
+def render_card(post, user, using=None):
+    """Render ``include/post_card.html`` for ``post`` as seen by ``user``.
+
+    The card itself is shared by all viewers and cached under a key that
+    changes with ``Post.version``; the author-only actions are rendered
+    per request and put in place of ``ACTIONS_MARKER``.
+    """
+    return render_cards([post], user, using)[0]
+
+
+def render_cards(posts, user, using=None):
+    """``render_card`` for a whole page of ``posts`` in one pass.
+
+    The templates are looked up once, in the engine ``using`` if given,
+    and the cached cards are fetched with a single ``get_many``.
+    """
+    posts = list(posts)
+    card = get_template('include/post_card.html', using=using)
+    htmls = get_many_or_compute(
+        {card_key(post, using): partial(card.render, {'post': post})
+         for post in posts},
+        settings.POST_CARD_CACHE_TIMEOUT)
+    actions = None
+    cards = []
+    for post in posts:
+        html = htmls[card_key(post, using)]
+        if user is not None and user.pk == post.author_id:
+            actions = actions or get_template(
+                'include/post_card_actions.html', using=using)
+            html = html.replace(ACTIONS_MARKER, actions.render({'post': post}))
+        else:
+            html = html.replace(ACTIONS_MARKER, '')
+        cards.append(html)
+    return cards
+
+
+def bump_versions(posts):
+    posts.update(version=F('version') + 1)
@@ -0,0 +1,212 @@
+"""Optional write buffer for new comments.
+
+With ``COMMENT_BUFFER_ENABLED`` the request that posts a comment does not
+save it: the comment is queued in the worker process, and a background
+thread writes the queue every ``COMMENT_BUFFER_FLUSH_INTERVAL`` seconds,
+or as soon as ``COMMENT_BUFFER_MAX_SIZE`` comments are waiting, with one
+``bulk_create`` per transaction. A burst on a popular post then takes a
+few write locks instead of one per comment. ``bulk_create`` skips the
+signals, so a flush bumps the comment counters and page validators itself.
+
+Until it is written, the author sees their comment from the session.
+The queue lives in memory: a worker that is killed loses up to one
+interval of comments, which is why the buffer is off by default.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, close_old_connections, transaction
+
+from . import counters, freshness
+from .models import Comment, Post
+
+User = get_user_model()
+
+SESSION_KEY = 'pending_comments'
+# Queued comments not written by then are no longer shown to their author.
+PENDING_TIMEOUT = 60
+
+logger = logging.getLogger('yatube.comments')
+
+_lock = threading.Condition()
+_queue = []
+_flusher = None
+_stats = {
+    'max_depth': 0,
+    'flushes': 0,
+    'written': 0,
+    'dropped': 0,
+    'last_flush_ms': 0.0,
+    'max_flush_ms': 0.0,
+}
+
+
+def stats():
+    """Queue depth and flush counters of this process."""
+    with _lock:
+        return dict(_stats, depth=len(_queue))
+
+
+def submit(request, comment):
+    """Save ``comment``, or queue it when the buffer is enabled."""
+    if not settings.COMMENT_BUFFER_ENABLED:
+        comment.save()
+        return
+    _remember(request, comment)
+    with _lock:
+        _queue.append(comment)
+        depth = len(_queue)
+        _stats['max_depth'] = max(_stats['max_depth'], depth)
+        full = depth >= settings.COMMENT_BUFFER_MAX_SIZE
+        if full:
+            _lock.notify()
+    if not settings.COMMENT_BUFFER_FLUSH_INTERVAL:
+        if full:
+            flush()
+    else:
+        _start()
+
+
+def _start():
+    global _flusher
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(
+            target=_run, name='comment-buffer', daemon=True)
+        _flusher.start()
+
+
+def _run():
+    while True:
+        with _lock:
+            _lock.wait_for(
+                lambda: len(_queue) >= settings.COMMENT_BUFFER_MAX_SIZE,
+                timeout=settings.COMMENT_BUFFER_FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            logger.exception('Не удалось записать комментарии')
+        finally:
+            close_old_connections()
+
+
+def flush():
+    """Write every queued comment; return the number written.
+
+    A batch that fails with ``OperationalError``, e.g. a locked database,
+    is put back at the head of the queue for the next flush.
+    """
+    written = 0
+    while True:
+        with _lock:
+            batch = _queue[:settings.COMMENT_BUFFER_MAX_SIZE]
+            del _queue[:len(batch)]
+        if not batch:
+            return written
+        started = time.perf_counter()
+        try:
+            saved = _write(batch)
+        except OperationalError:
+            with _lock:
+                _queue[:0] = batch
+            raise
+        elapsed = (time.perf_counter() - started) * 1000
+        written += saved
+        with _lock:
+            _stats['flushes'] += 1
+            _stats['written'] += saved
+            _stats['dropped'] += len(batch) - saved
+            _stats['last_flush_ms'] = elapsed
+            _stats['max_flush_ms'] = max(_stats['max_flush_ms'], elapsed)
+            depth = len(_queue)
+        logger.info(
+            'Записано комментариев: %s за %.1f мс', saved, elapsed,
+            extra={'metrics': {
+                'batch': len(batch), 'written': saved, 'depth': depth,
+                'flush_ms': round(elapsed, 2)}})
+
+
+# Whatever is still queued when the worker exits normally is written.
+atexit.register(flush)
+
+
+def _write(batch):
+    # Posts or authors deleted while their comments were queued are skipped.
+    posts = set(Post.objects.filter(
+        pk__in={comment.post_id for comment in batch}
+    ).values_list('pk', flat=True))
+    authors = set(User.objects.filter(
+        pk__in={comment.author_id for comment in batch}
+    ).values_list('pk', flat=True))
+    comments = [
+        comment for comment in batch
+        if comment.post_id in posts and comment.author_id in authors]
+    with transaction.atomic():
+        Comment.objects.bulk_create(comments)
+        per_post = Counter(comment.post_id for comment in comments)
+        for post_id, count in per_post.items():
+            counters.bump_comments(post_id, count)
+        freshness.touch_posts(Post.objects.filter(pk__in=per_post))
+    return len(comments)
+
+
+def _remember(request, comment):
+    queued = request.session.get(SESSION_KEY, [])
+    queued.append({
+        'post': comment.post_id, 'text': comment.text, 'queued': time.time()})
+    request.session[SESSION_KEY] = queued
+
+
+def _queued(request, post_id):
+    if not request.user.is_authenticated:
+        return []
+    return [
+        entry for entry in request.session.get(SESSION_KEY, ())
+        if entry['post'] == post_id]
+
+
+def pending_marks(request, post_id):
+    """What of ``request.user``'s queued comments goes into the ETag."""
+    return [entry['queued'] for entry in _queued(request, post_id)]
+
+
+def pending(request, post_id):
+    """Unsaved comments of ``request.user`` on ``post_id`` still queued.
+
+    Entries that have been written since, or waited longer than
+    ``PENDING_TIMEOUT``, are dropped from the session.
+    """
+    queued = _queued(request, post_id)
+    if not queued:
+        return []
+    oldest = min(entry['queued'] for entry in queued)
+    written = Counter(Comment.objects.filter(
+        post_id=post_id, author=request.user,
+        text__in={entry['text'] for entry in queued},
+        created__gte=_datetime(oldest),
+    ).values_list('text', flat=True))
+    now = time.time()
+    keep = []
+    for entry in queued:
+        if written[entry['text']]:
+            written[entry['text']] -= 1
+        elif now - entry['queued'] < PENDING_TIMEOUT:
+            keep.append(entry)
+    request.session[SESSION_KEY] = [
+        entry for entry in request.session[SESSION_KEY]
+        if entry['post'] != post_id] + keep
+    return [
+        Comment(post_id=post_id, author=request.user, text=entry['text'],
+                created=_datetime(entry['queued']))
+        for entry in reversed(keep)]
+
+
+def _datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc)
@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+AUTHOR_COUNTERS = {
+    'post_count': (Post, 'author'),
+    'follower_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def _count(model, field, outer='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer)}).order_by().values(
+            field).annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def author_stats(user):
+    stats = AuthorStats.objects.filter(user=user).first()
+    if stats is None:
+        reconcile_authors(User.objects.filter(pk=user.pk))
+        stats = AuthorStats.objects.get(user=user)
+    return stats
+
+
+def _add(field, delta):
+    # A counter that drifted low must not go below zero: the fields are
+    # positive, and the next reconcile recounts them anyway.
+    value = F(field) + delta
+    return value if delta >= 0 else Greatest(value, 0)
+
+
+def bump_author(user_id, **deltas):
+    updated = AuthorStats.objects.filter(user_id=user_id).update(**{
+        field: _add(field, delta) for field, delta in deltas.items()})
+    # A missing row is recounted on creation paths only: on deletion it
+    # may be going away together with the user.
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        reconcile_authors(User.objects.filter(pk=user_id))
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=_add('comment_count', delta),
+        version=F('version') + 1)
+
+
+def reconcile_posts(posts=None):
+    """Recount ``Post.comment_count``; return the number of fixed rows."""
+    posts = Post.objects.all() if posts is None else posts
+    real = _count(Comment, 'post')
+    drifted = posts.annotate(real=real).filter(~Q(comment_count=F('real')))
+    with transaction.atomic():
+        fixed = Post.objects.filter(pk__in=list(
+            drifted.values_list('pk', flat=True))).update(comment_count=real)
+    return fixed
+
+
+def reconcile_authors(users=None):
+    """Recount ``AuthorStats`` rows; return the number of fixed rows."""
+    users = User.objects.all() if users is None else users
+    with transaction.atomic():
+        AuthorStats.objects.bulk_create(
+            [AuthorStats(user_id=pk) for pk in users.filter(
+                stats__isnull=True).values_list('pk', flat=True)],
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        drifted = users.annotate(**{
+            f'real_{field}': _count(model, related)
+            for field, (model, related) in AUTHOR_COUNTERS.items()
+        }).filter(
+            ~Q(stats__post_count=F('real_post_count'))
+            | ~Q(stats__follower_count=F('real_follower_count'))
+            | ~Q(stats__following_count=F('real_following_count'))
+        )
+        return AuthorStats.objects.filter(
+            user__in=list(drifted.values_list('pk', flat=True))
+        ).update(**{
+            field: _count(model, related, outer='user_id')
+            for field, (model, related) in AUTHOR_COUNTERS.items()})
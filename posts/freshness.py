@@ -0,0 +1,209 @@
+"""ETag and Last-Modified of the feeds and post pages.
+
+Every page is built from a few scopes: the global feed, a group, an
+author (their posts, counters and followers) and a reader's follow feed.
+Signals bump the ``FeedState`` row of each scope a change touches, so a
+page's validators come from one small query instead of the page queries,
+and a repeat visit is answered with 304 before anything is rendered.
+
+A reader's follow feed scope is only bumped when they follow or unfollow
+someone; the feed's validators add up the versions of the followed
+authors' scopes, so a post or a comment never writes to its followers.
+
+The validators run on every request, so they read with plain SQL: building
+and compiling their querysets cost more than running them.
+"""
+import hashlib
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+from django.db.models import F
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from . import comment_buffer
+from .models import FeedState, Follow, Group, Post
+
+User = get_user_model()
+
+INDEX = 'index'
+# Scopes per query, well under SQLite's limit on query parameters.
+BATCH_SIZE = 500
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(user_id):
+    return f'author:{user_id}'
+
+
+def feed_scope(user_id):
+    return f'feed:{user_id}'
+
+
+def post_scopes(author_id, group_id):
+    scopes = {INDEX, author_scope(author_id)}
+    if group_id is not None:
+        scopes.add(group_scope(group_id))
+    return scopes
+
+
+def touch(scopes):
+    """Bump the version of every scope in ``scopes``."""
+    scopes = iter(set(scopes))
+    now = timezone.now()
+    while True:
+        batch = set(islice(scopes, BATCH_SIZE))
+        if not batch:
+            return
+        existing = FeedState.objects.filter(scope__in=batch)
+        existing.update(version=F('version') + 1, changed=now)
+        missing = batch - set(existing.values_list('scope', flat=True))
+        FeedState.objects.bulk_create(
+            [FeedState(scope=scope, version=1, changed=now)
+             for scope in missing],
+            ignore_conflicts=True)
+
+
+def touch_posts(posts):
+    """Bump the scopes of every post in the ``posts`` queryset."""
+    scopes = set()
+    for author_id, group_id in posts.values_list(
+            'author_id', 'group_id').distinct():
+        scopes |= post_scopes(author_id, group_id)
+    touch(scopes)
+
+
+def _states(scopes):
+    """``(scope, version, changed)`` of the stored ``scopes``."""
+    connection = connections[router.db_for_read(FeedState)]
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(FeedState._meta.get_field(name).column)
+        for name in ('scope', 'version', 'changed'))
+    column = FeedState._meta.get_field('changed').cached_col
+    converters = connection.ops.get_db_converters(column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {columns} FROM {quote(FeedState._meta.db_table)} '
+            f'WHERE {quote("scope")} IN ({", ".join(["%s"] * len(scopes))})',
+            list(scopes))
+        rows = cursor.fetchall()
+    for scope, version, changed in rows:
+        for converter in converters:
+            changed = converter(changed, column, connection)
+        yield scope, version, changed
+
+
+def _select(model, field, where, value):
+    """``field`` of the ``model`` rows whose ``where`` field is ``value``."""
+    connection = connections[router.db_for_read(model)]
+    quote = connection.ops.quote_name
+    field, where = (
+        quote(model._meta.get_field(name).column) for name in (field, where))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {field} FROM {quote(model._meta.db_table)} '
+            f'WHERE {where} = %s',
+            [value])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _pk(model, field, value):
+    found = _select(model, model._meta.pk.name, field, value)
+    return found[0] if found else None
+
+
+class Validators:
+    """ETag and Last-Modified of one page, for one user."""
+
+    def __init__(self, scopes, user, extra=(), modified=()):
+        states = dict.fromkeys(scopes, (0, None))
+        states.update(
+            (scope, (version, changed))
+            for scope, version, changed in _states(states))
+        identity = [user.pk, *extra] + [
+            f'{scope}={version}'
+            for scope, (version, _) in sorted(states.items())]
+        self.etag = hashlib.md5(
+            '|'.join(map(str, identity)).encode()).hexdigest()
+        dates = [changed for _, changed in states.values()] + list(modified)
+        dates = [date for date in dates if date is not None]
+        self.last_modified = max(dates) if dates else None
+
+
+def conditional(validators):
+    """``condition`` with both validators from one ``validators`` call.
+
+    ``validators(request, *args, **kwargs)`` returns ``Validators`` or
+    ``None`` when the page does not exist.
+    """
+    def get(request, *args, **kwargs):
+        if not hasattr(request, 'validators'):
+            request.validators = validators(request, *args, **kwargs)
+        return request.validators
+
+    def etag(request, *args, **kwargs):
+        found = get(request, *args, **kwargs)
+        return found and found.etag
+
+    def last_modified(request, *args, **kwargs):
+        found = get(request, *args, **kwargs)
+        return found and found.last_modified
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def index_validators(request):
+    return Validators([INDEX], request.user)
+
+
+def group_validators(request, slug):
+    group_id = _pk(Group, 'slug', slug)
+    if group_id is None:
+        return None
+    return Validators([group_scope(group_id)], request.user)
+
+
+def profile_validators(request, username):
+    user_id = _pk(User, 'username', username)
+    if user_id is None:
+        return None
+    return Validators([author_scope(user_id)], request.user)
+
+
+def post_validators(request, username, post_id):
+    # Comments bump both the version and the author scope, so neither
+    # the comments nor their dates need to be read here.
+    post = Post.objects.filter(
+        pk=post_id, author__username=username
+    ).values('author_id', 'version', 'pub_date').first()
+    if post is None:
+        return None
+    return Validators(
+        [author_scope(post['author_id'])], request.user,
+        extra=[post_id, post['version'],
+               *comment_buffer.pending_marks(request, post_id)],
+        modified=[post['pub_date']])
+
+
+def follow_validators(request):
+    user = request.user
+    # Versions only grow, so their sum changes with any followed author;
+    # a follow or unfollow, which changes the set, bumps the feed scope.
+    scopes = iter([
+        author_scope(pk) for pk in _select(Follow, 'author', 'user', user.pk)])
+    version, modified = 0, []
+    while True:
+        batch = list(islice(scopes, BATCH_SIZE))
+        if not batch:
+            break
+        for _, scope_version, changed in _states(batch):
+            version += scope_version
+            modified.append(changed)
+    return Validators(
+        [author_scope(user.pk), feed_scope(user.pk)], user,
+        extra=[version], modified=modified)
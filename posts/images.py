@@ -0,0 +1,205 @@
+"""Image processing for post uploads and their card variants.
+
+``normalize`` runs on upload: it applies the EXIF orientation and scales
+images down to ``IMAGE_MAX_SIZE``, keeping their name and format, so
+full-size phone photos never reach the storage. Animations are scaled
+frame by frame; of a multi-picture (MPO) photo only the first, plain
+JPEG picture is kept. ``card_variants`` crops
+an image to the card shape once per width in ``CARD_WIDTHS`` and encodes
+every width as AVIF (when Pillow can write it), WebP and a JPEG
+fallback, for ``srcset``. The variants are named after the image, so
+the storage itself records which of them are ready.
+"""
+import io
+import posixpath
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps, ImageSequence
+
+from .models import Post
+
+ORIENTATION = 0x0112
+CARD_SIZE = (960, 339)
+CARD_WIDTHS = (480, 960)
+CARD_SIZES = '(max-width: 960px) 100vw, 960px'
+
+# Format: file extension, MIME type and save() options.
+ENCODINGS = {
+    'AVIF': ('avif', 'image/avif', {'quality': 60}),
+    'WEBP': ('webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'JPEG': ('jpg', 'image/jpeg', {
+        'quality': 82, 'optimize': True, 'progressive': True}),
+}
+FALLBACK = 'JPEG'
+# Options for re-encoding a normalized upload in its own format.
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'WEBP': {'quality': 90},
+    'PNG': {'optimize': True},
+}
+
+
+def card_formats():
+    """Formats of the card variants this Pillow can write, best first."""
+    Image.init()
+    return [name for name in ENCODINGS if name in Image.SAVE]
+
+
+def normalize(upload):
+    """``upload`` oriented and scaled down to ``IMAGE_MAX_SIZE``.
+
+    Images that need neither are returned unchanged.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        format = image.format
+        limit = settings.IMAGE_MAX_SIZE
+        if format == 'MPO':
+            format = 'JPEG'
+        elif getattr(image, 'is_animated', False):
+            if max(image.size) <= limit:
+                upload.seek(0)
+                return upload
+            return _normalize_animation(upload, image, limit)
+        elif (image.getexif().get(ORIENTATION, 1) == 1
+                and max(image.size) <= limit):
+            upload.seek(0)
+            return upload
+        # Only the open, first picture of an MPO file is saved.
+        oriented = ImageOps.exif_transpose(image)
+        oriented.thumbnail((limit, limit), Image.LANCZOS)
+        if format == 'JPEG' and oriented.mode not in ('RGB', 'L'):
+            oriented = oriented.convert('RGB')
+        buffer = io.BytesIO()
+        oriented.save(buffer, format, **SAVE_OPTIONS.get(format, {}))
+    return SimpleUploadedFile(
+        upload.name, buffer.getvalue(),
+        getattr(upload, 'content_type', None))
+
+
+def _normalize_animation(upload, image, limit):
+    format = image.format
+    frames, durations = [], []
+    for frame in ImageSequence.Iterator(image):
+        durations.append(frame.info.get('duration', 0))
+        frame = frame.convert('RGBA')
+        frame.thumbnail((limit, limit), Image.LANCZOS)
+        frames.append(frame)
+    options = dict(SAVE_OPTIONS.get(format, {}))
+    if 'loop' in image.info:
+        options['loop'] = image.info['loop']
+    buffer = io.BytesIO()
+    # The frames are whole pictures, so each one replaces the last.
+    frames[0].save(
+        buffer, format, save_all=True, append_images=frames[1:],
+        duration=durations, disposal=2, **options)
+    return SimpleUploadedFile(
+        upload.name, buffer.getvalue(),
+        getattr(upload, 'content_type', None))
+
+
+def variant_name(name, width, extension):
+    return posixpath.join('cards', f'{name}.{width}.{extension}')
+
+
+def variant_names(name):
+    """Every name a card variant of ``name`` may have been saved under."""
+    return [
+        variant_name(name, width, extension)
+        for width in CARD_WIDTHS
+        for extension, _, _ in ENCODINGS.values()]
+
+
+def _save(name, data):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(data))
+
+
+def card_variants(name):
+    """Build the card variants of the stored image ``name``.
+
+    Returns what the card template needs: ``src`` and ``srcset`` of the
+    JPEG fallback, ``sources`` with the ``type`` and ``srcset`` of each
+    better format, and ``sizes``; ``files`` lists the saved variants.
+    """
+    formats = card_formats()
+    storage = Post.image.field.storage
+    with storage.open(name) as file, Image.open(file) as source:
+        image = ImageOps.exif_transpose(source).convert('RGB')
+        width, height = CARD_SIZE
+        for card_width in CARD_WIDTHS:
+            card = ImageOps.fit(
+                image, (card_width, round(card_width * height / width)),
+                Image.LANCZOS)
+            for format in formats:
+                extension, _, options = ENCODINGS[format]
+                buffer = io.BytesIO()
+                card.save(buffer, format, **options)
+                _save(
+                    variant_name(name, card_width, extension),
+                    buffer.getvalue())
+    return _describe(name, formats)
+
+
+def _stored(name, format):
+    extension = ENCODINGS[format][0]
+    return all(
+        default_storage.exists(variant_name(name, width, extension))
+        for width in CARD_WIDTHS)
+
+
+def stored_variants(name):
+    """The card variants of ``name`` found in the storage, or ``None``.
+
+    A format counts once every width of it has been saved; without the
+    JPEG fallback the variants are not ready.
+    """
+    try:
+        if not _stored(name, FALLBACK):
+            return None
+    except SuspiciousFileOperation:
+        # Legacy names outside MEDIA_ROOT have no variants.
+        return None
+    return _describe(name, [
+        format for format in ENCODINGS
+        if format == FALLBACK or _stored(name, format)])
+
+
+def move_variants(old, new):
+    """Rename the stored card variants of ``old`` after ``new``."""
+    for source, target in zip(variant_names(old), variant_names(new)):
+        if default_storage.exists(source):
+            with default_storage.open(source) as file:
+                _save(target, file.read())
+            default_storage.delete(source)
+
+
+def _describe(name, formats):
+    srcsets = {
+        format: [
+            (variant_name(name, width, ENCODINGS[format][0]), width)
+            for width in CARD_WIDTHS]
+        for format in formats}
+    files = [file for srcset in srcsets.values() for file, _ in srcset]
+    urls = {
+        format: [(default_storage.url(file), width) for file, width in srcset]
+        for format, srcset in srcsets.items()}
+    fallback = urls.pop(FALLBACK)
+    return {
+        'src': fallback[-1][0],
+        'srcset': _srcset(fallback),
+        'sources': [
+            {'type': ENCODINGS[format][1], 'srcset': _srcset(srcset)}
+            for format, srcset in urls.items()],
+        'sizes': CARD_SIZES,
+        'files': files,
+    }
+
+
+def _srcset(urls):
+    return ', '.join(f'{url} {width}w' for url, width in urls)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.caching import shared_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша по префиксам ключей'
+
+    def handle(self, *args, **options):
+        prefixes = {}
+        for (prefix, event), count in shared_stats().items():
+            prefixes.setdefault(prefix, {})[event] = count
+        for prefix, events in sorted(prefixes.items()):
+            hits = events.get('hit', 0)
+            total = hits + events.get('miss', 0) + events.get('early', 0)
+            ratio = hits / total if total else 0
+            self.stdout.write(
+                f'{prefix}: hit={hits} miss={events.get("miss", 0)} '
+                f'early={events.get("early", 0)} ratio={ratio:.2%}')
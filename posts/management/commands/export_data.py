@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает сообщества, посты, комментарии или подписки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=transfer.KINDS)
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default=transfer.NDJSON)
+        parser.add_argument(
+            '--output', help='Файл выгрузки; по умолчанию stdout')
+
+    def handle(self, *args, **options):
+        kind, format = options['kind'], options['format']
+        if not options['output']:
+            transfer.export(kind, self.stdout, format)
+            return
+        with open(options['output'], 'w', newline='',
+                  encoding='utf-8') as file:
+            count = transfer.export(kind, file, format)
+        self.stderr.write(f'Выгружено записей: {count}')
@@ -0,0 +1,24 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from posts import media
+
+
+class Command(BaseCommand):
+    help = 'Удаляет изображения, на которые не ссылается ни один пост'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько файлов проверять одним запросом')
+
+    def handle(self, *args, **options):
+        names = media.stored_names(media.IMAGE_DIRECTORY)
+        deleted = 0
+        while True:
+            chunk = list(islice(names, options['batch_size']))
+            if not chunk:
+                break
+            deleted += len(media.collect(chunk))
+        self.stdout.write(f'Удалено файлов: {deleted}')
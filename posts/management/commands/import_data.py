@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает сообщества, посты, комментарии или подписки '
+        'из выгрузки export_data')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=transfer.KINDS)
+        parser.add_argument('path', help='Файл NDJSON или CSV')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='По умолчанию определяется по расширению файла')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Число записей в одной транзакции')
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки; по умолчанию <path>.checkpoint')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с контрольной точки прерванной загрузки')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or (
+            transfer.CSV if path.endswith('.csv') else transfer.NDJSON)
+        checkpoint = options['checkpoint'] or path + '.checkpoint'
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        with open(path, newline='', encoding='utf-8') as file:
+            try:
+                result = transfer.import_rows(
+                    options['kind'], transfer.read(file, format),
+                    batch_size=options['batch_size'],
+                    checkpoint=checkpoint, resume=options['resume'])
+            except ValueError as error:
+                raise CommandError(error)
+        self.stdout.write(
+            f'Обработано записей: {result["records"]}, '
+            f'загружено: {result["imported"]}')
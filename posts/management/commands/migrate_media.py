@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from posts import media
+from posts.models import Post
+from posts.storage import is_content_addressed
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит изображения постов в хранилище с именами по '
+        'содержимому, объединяя одинаковые файлы')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Число параллельных потоков')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько файлов переносить за одну транзакцию')
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True).values_list('image', flat=True).distinct()
+        # Materialized first: the moves change the rows being iterated.
+        names = iter([
+            name for name in names.iterator()
+            if not is_content_addressed(name)])
+        moved = missing = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                chunk = list(islice(names, options['batch_size']))
+                if not chunk:
+                    break
+                renames = {}
+                # Hashing and linking run in parallel, the posts are
+                # moved over in one transaction per chunk.
+                for old, new in zip(chunk, pool.map(media.link, chunk)):
+                    if new is None:
+                        missing += 1
+                    else:
+                        renames[old] = new
+                media.move(renames)
+                moved += len(renames)
+                self.stdout.write(f'Перенесено: {moved}')
+        self.stdout.write(
+            f'Готово: {moved}, файлов не найдено: {missing}')
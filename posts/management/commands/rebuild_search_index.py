@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс постов и сообществ'
+
+    def handle(self, *args, **options):
+        counts = search.rebuild()
+        self.stdout.write(
+            f'Проиндексировано постов: {counts[search.POST]}, '
+            f'сообществ: {counts[search.GROUP]}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и авторов'
+
+    def handle(self, *args, **options):
+        posts = counters.reconcile_posts()
+        authors = counters.reconcile_authors()
+        self.stdout.write(
+            f'Исправлено постов: {posts}, авторов: {authors}')
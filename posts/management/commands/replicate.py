@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube.replicas import replicate
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу в реплики: замена репликации '
+        'для локального запуска')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять каждые столько секунд, пока не прервут')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте YATUBE_DB_REPLICAS=1')
+        while True:
+            started = time.monotonic()
+            replicate()
+            self.stdout.write(
+                'Реплики обновлены: {} за {:.0f} мс'.format(
+                    ', '.join(settings.DATABASE_REPLICAS),
+                    (time.monotonic() - started) * 1000))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _generate(name):
+    try:
+        return thumbnails.generate(name)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Заранее создаёт миниатюры карточек для существующих постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число параллельных потоков')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Создать миниатюры заново, даже если они готовы')
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True).values_list('image', flat=True).distinct()
+        names = (
+            name for name in names.iterator()
+            if options['force'] or not thumbnails.card_thumbnail_url(name))
+        workers = options['workers']
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                done, failed = self._run(
+                    partial(pool.map, _generate), names, workers)
+        else:
+            # Inline runs share the connection of the names iterator,
+            # so it must not be closed between images.
+            done, failed = self._run(
+                partial(map, thumbnails.generate), names, 1)
+        self.stdout.write(f'Готово: {done}, с ошибками: {failed}')
+
+    def _run(self, map_function, names, workers):
+        done = failed = 0
+        # Submit in chunks so millions of images are never queued at once.
+        while True:
+            chunk = list(islice(names, workers * 100))
+            if not chunk:
+                return done, failed
+            for url in map_function(chunk):
+                if url:
+                    done += 1
+                else:
+                    failed += 1
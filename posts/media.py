@@ -0,0 +1,123 @@
+"""Reference counting, garbage collection and migration of post images.
+
+The reference count of an image is the number of posts whose ``image``
+holds its name, read from the index on that column. When an edit or a
+delete commits, the images it let go of are collected if nothing refers
+to them any more, together with their card variants. Files younger than
+``MEDIA_GC_GRACE_SECONDS`` are left alone, because a concurrent upload
+of the same content may be about to refer to them; ``gc_media`` sweeps
+them up later.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import F
+
+from . import freshness, thumbnails
+from .models import Post
+from .storage import content_name, digest, is_content_addressed
+
+logger = logging.getLogger(__name__)
+
+storage = Post.image.field.storage
+IMAGE_DIRECTORY = Post.image.field.upload_to.strip('/')
+CHUNK_SIZE = 64 * 1024
+
+
+def references(names):
+    """The names of ``names`` that at least one post refers to."""
+    return set(Post.objects.filter(image__in=list(names)).order_by(
+    ).values_list('image', flat=True))
+
+
+def _expired(name):
+    try:
+        modified = os.path.getmtime(storage.path(name))
+    except SuspiciousFileOperation:
+        # Not a file of this storage, e.g. a legacy absolute path.
+        return False
+    except FileNotFoundError:
+        return True
+    return time.time() - modified >= settings.MEDIA_GC_GRACE_SECONDS
+
+
+def collect(names):
+    """Delete the ``names`` no post refers to; return the deleted ones."""
+    names = set(filter(None, names))
+    orphans = [
+        name for name in names - references(names) if _expired(name)]
+    for name in orphans:
+        try:
+            storage.delete(name)
+            thumbnails.forget(name)
+        except OSError:
+            logger.exception('Не удалось удалить %s', name)
+    return orphans
+
+
+def release(name):
+    """Collect ``name`` once the current transaction commits."""
+    if name:
+        transaction.on_commit(lambda: collect([name]))
+
+
+def stored_names(directory):
+    """Names of the files stored under ``directory``, e.g. ``posts``."""
+    root = storage.path(directory)
+    for path, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.endswith('.part'):
+                yield os.path.relpath(
+                    os.path.join(path, filename), storage.location
+                ).replace(os.sep, '/')
+
+
+def _chunks(path):
+    with open(path, 'rb') as file:
+        yield from iter(lambda: file.read(CHUNK_SIZE), b'')
+
+
+def link(name):
+    """Give the file ``name`` its content-addressed name as well.
+
+    Returns the new name, or ``None`` if the file is missing. The old
+    name stays until ``unlink`` removes it, so both keep working while
+    the posts are moved over.
+    """
+    path = storage.path(name)
+    if is_content_addressed(name) or not os.path.exists(path):
+        return None
+    new = content_name(name, digest(_chunks(path)))
+    target = storage.path(new)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(path, target)
+        except OSError:
+            with storage.open(name) as file:
+                storage.save(new, file)
+    return new
+
+
+def move(renames):
+    """Point the posts of every ``old: new`` image name at the new one.
+
+    The old files are removed once the posts no longer refer to them.
+    """
+    with transaction.atomic():
+        for old, new in renames.items():
+            # The cached cards may show variants that rename() deletes.
+            Post.objects.filter(image=old).update(
+                image=new, version=F('version') + 1)
+            thumbnails.rename(old, new)
+        freshness.touch_posts(
+            Post.objects.filter(image__in=set(renames.values())))
+    for old in renames:
+        try:
+            os.remove(storage.path(old))
+        except FileNotFoundError:
+            pass
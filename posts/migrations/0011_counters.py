@@ -0,0 +1,64 @@
+# Generated by Django 3.2.25 on 2026-10-18 05:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    def count(model, field):
+        return models.functions.Coalesce(models.Subquery(
+            model.objects.filter(**{field: models.OuterRef('pk')}).order_by(
+            ).values(field).annotate(count=models.Count('pk')).values(
+                'count'),
+            output_field=models.IntegerField()
+        ), 0)
+
+    Post.objects.update(comment_count=count(Comment, 'post'))
+    users = User.objects.annotate(
+        real_post_count=count(Post, 'author'),
+        real_follower_count=count(Follow, 'author'),
+        real_following_count=count(Follow, 'user'),
+    )
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(
+            user_id=user.pk,
+            post_count=user.real_post_count,
+            follower_count=user.real_follower_count,
+            following_count=user.real_following_count
+        ) for user in users.iterator()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0010_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='число комментариев'),
+        ),
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='записей')),
+                ('follower_count', models.PositiveIntegerField(default=0, verbose_name='подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='подписок')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
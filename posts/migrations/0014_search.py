@@ -0,0 +1,63 @@
+# Generated by Django 3.2.25 on 2026-10-18 05:20
+
+from django.db import OperationalError, migrations, models
+
+FTS_TABLES = {
+    'posts_post_fts': ('posts_post', ('text',)),
+    'posts_group_fts': ('posts_group', ('title', 'description')),
+}
+
+
+def create_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table, (source, columns) in FTS_TABLES.items():
+            try:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE {table} USING fts5('
+                    f'{", ".join(columns)}, tokenize = "unicode61")')
+            except OperationalError:
+                # SQLite without FTS5: the pure-Python index is used.
+                return
+            cursor.execute(
+                f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+                f'SELECT id, {", ".join(columns)} FROM {source}')
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in FTS_TABLES:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=5, verbose_name='тип')),
+                ('object_id', models.PositiveIntegerField(verbose_name='объект')),
+                ('term', models.CharField(max_length=100, verbose_name='слово')),
+                ('frequency', models.PositiveIntegerField(verbose_name='вхождений')),
+                ('length', models.PositiveIntegerField(verbose_name='слов в документе')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchposting',
+            index=models.Index(fields=['kind', 'object_id'], name='search_posting_object_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchposting',
+            constraint=models.UniqueConstraint(fields=('kind', 'term', 'object_id'), name='search_posting_constraint'),
+        ),
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+    ]
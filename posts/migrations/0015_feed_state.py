@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-18 05:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=100, unique=True, verbose_name='область')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='версия')),
+                ('changed', models.DateTimeField(verbose_name='изменено')),
+            ],
+        ),
+    ]
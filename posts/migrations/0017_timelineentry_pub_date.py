@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+def fill_pub_dates(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    TimelineEntry.objects.update(pub_date=models.Subquery(
+        Post.objects.filter(pk=models.OuterRef('post_id')).values(
+            'pub_date')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timelineentry',
+            name='pub_date',
+            field=models.DateTimeField(null=True, verbose_name='дата публикации'),
+        ),
+        migrations.RunPython(fill_pub_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='timelineentry',
+            name='pub_date',
+            field=models.DateTimeField(verbose_name='дата публикации'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='timeline_user_pub_date_idx'),
+        ),
+    ]
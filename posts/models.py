@@ -1,9 +1,17 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    def for_cards(self):
+        """Everything ``include/post_item.html`` reads, in one query."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
@@ -18,14 +26,47 @@ class Post(models.Model):
         related_name='posts', verbose_name='Группа',
         help_text='Укажите, какой группе принадлежит произведение'
     )
-    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    image = models.ImageField(
+        upload_to='posts/', storage=ContentAddressedStorage(),
+        blank=True, null=True, db_index=True)
+    comment_count = models.PositiveIntegerField(
+        'число комментариев', default=0, editable=False)
+    version = models.PositiveIntegerField(
+        'версия', default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    # Counters are only changed with F() updates in posts.counters.
+    COUNTER_FIELDS = ('comment_count', 'version')
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        if self._state.adding or (
+                kwargs.get('update_fields') or kwargs.get('force_insert')):
+            return super().save(*args, **kwargs)
+        kwargs['update_fields'] = [
+            field.attname for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.name not in self.COUNTER_FIELDS] + ['version']
+        self.version = models.F('version') + 1
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -54,6 +95,11 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -79,6 +125,92 @@ class Follow(models.Model):
                 fields=['user', 'author'],
                 name='follow_constraint'),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='пост'
+    )
+    # A copy of post.pub_date, so that a page of the timeline is read from
+    # the timeline's own index.
+    pub_date = models.DateTimeField('дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='timeline_entry_constraint'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post} в ленте {self.user}'
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Автор'
+    )
+    post_count = models.PositiveIntegerField('записей', default=0)
+    follower_count = models.PositiveIntegerField('подписчиков', default=0)
+    following_count = models.PositiveIntegerField('подписок', default=0)
+
+    def __str__(self):
+        return f'Счётчики {self.user}'
+
+
+class SearchPosting(models.Model):
+    """One term of a post or group in the pure-Python search index."""
+    kind = models.CharField('тип', max_length=5)
+    object_id = models.PositiveIntegerField('объект')
+    term = models.CharField('слово', max_length=100)
+    frequency = models.PositiveIntegerField('вхождений')
+    length = models.PositiveIntegerField('слов в документе')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'term', 'object_id'],
+                name='search_posting_constraint'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['kind', 'object_id'],
+                name='search_posting_object_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.term} в {self.kind} {self.object_id}'
+
+
+class FeedState(models.Model):
+    """Version of a page scope, bumped whenever its content changes."""
+    scope = models.CharField('область', max_length=100, unique=True)
+    version = models.PositiveIntegerField('версия', default=0)
+    changed = models.DateTimeField('изменено')
+
+    def __str__(self):
+        return f'{self.scope} v{self.version}'
@@ -0,0 +1,121 @@
+import base64
+import binascii
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(post, direction=NEXT, field='pub_date'):
+    if isinstance(post, dict):
+        # A row of a ``values()`` queryset, as the JSON API reads them.
+        date, pk = post[field], post['id']
+    else:
+        date, pk = getattr(post, field), post.pk
+    raw = f'{direction}|{date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPaginator:
+    """Keyset paginator over ``(field, id)``, ``pub_date`` by default.
+
+    Each page is fetched with ``WHERE (field, id) < cursor LIMIT n + 1``,
+    so neither ``COUNT(*)`` nor ``OFFSET`` is executed and every page costs
+    the same. The result is a regular ``Page`` over a one- or two-page
+    ``Paginator`` built from the fetched window, with ``next_cursor`` and
+    ``previous_cursor`` attached for the templates.
+    """
+
+    def __init__(self, queryset, per_page=POSTS_PER_PAGE, field='pub_date'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+
+    def get_page(self, cursor=None):
+        position = decode_cursor(cursor) if cursor else None
+        if position is None:
+            direction = NEXT
+            window = list(self._after(None)[:self.per_page + 1])
+        else:
+            direction, date, pk = position
+            if direction == NEXT:
+                window = list(self._after((date, pk))[:self.per_page + 1])
+            else:
+                window = list(self._before((date, pk))[:self.per_page + 1])
+                window.reverse()
+        has_more = len(window) > self.per_page
+        if direction == NEXT:
+            posts = window[:self.per_page]
+            has_next, has_previous = has_more, position is not None
+        else:
+            posts = window[-self.per_page:]
+            has_next, has_previous = True, has_more
+        page = Paginator(posts, self.per_page).page(1)
+        page.next_cursor = (
+            encode_cursor(posts[-1], NEXT, self.field)
+            if has_next and posts else None)
+        page.previous_cursor = (
+            encode_cursor(posts[0], PREVIOUS, self.field)
+            if has_previous and posts else None)
+        return page
+
+    def _after(self, position):
+        return after(self.queryset, position, self.field)
+
+    def _before(self, position):
+        return before(self.queryset, position, self.field)
+
+
+def after(queryset, position, field='pub_date', key='id'):
+    """``queryset`` newest first, past ``position`` if it is given."""
+    queryset = queryset.order_by(f'-{field}', f'-{key}')
+    if position is None:
+        return queryset
+    date, pk = position
+    # The redundant range keeps the scan on the (field, key) index.
+    return queryset.filter(
+        Q(**{f'{field}__lte': date}),
+        Q(**{f'{field}__lt': date}) | Q(**{f'{key}__lt': pk}))
+
+
+def before(queryset, position, field='pub_date', key='id'):
+    """``queryset`` oldest first, up to ``position``."""
+    date, pk = position
+    return queryset.order_by(field, key).filter(
+        Q(**{f'{field}__gte': date}),
+        Q(**{f'{field}__gt': date}) | Q(**{f'{key}__gt': pk}))
+
+
+def get_page(request, queryset, per_page=POSTS_PER_PAGE,
+             paginator_class=CursorPaginator):
+    """Return the requested page of ``queryset``.
+
+    ``?cursor=`` and bare requests go through ``paginator_class``; old
+    ``?page=N`` links keep working through the offset ``Paginator``.
+    """
+    page_number = request.GET.get('page')
+    if page_number and not request.GET.get('cursor'):
+        paginator = Paginator(queryset.order_by('-pub_date', '-id'), per_page)
+        return paginator.get_page(page_number)
+    return paginator_class(queryset, per_page).get_page(
+        request.GET.get('cursor'))
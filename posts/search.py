@@ -0,0 +1,210 @@
+"""Full-text search over post texts and group titles and descriptions.
+
+On SQLite with FTS5 the documents live in the ``posts_post_fts`` and
+``posts_group_fts`` virtual tables created by migration 0014, keyed by
+the primary key of the object. Elsewhere ``SearchPosting`` rows form a
+plain inverted index which is ranked with BM25 in Python. Signals keep
+the active index up to date; ``rebuild_search_index`` refills it.
+"""
+import math
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Group, Post, SearchPosting
+
+POST, GROUP = 'post', 'group'
+FTS5, PYTHON = 'fts5', 'python'
+
+# Table, columns and BM25 weights of the columns of every kind.
+FTS_TABLES = {
+    POST: ('posts_post_fts', ('text',), (1.0,)),
+    GROUP: ('posts_group_fts', ('title', 'description'), (2.0, 1.0)),
+}
+MODELS = {POST: Post, GROUP: Group}
+
+# Letters and digits, as the unicode61 tokenizer of FTS5 splits them.
+TERM_RE = re.compile(r'[^\W_]+')
+MAX_TERM_LENGTH = 100
+BM25_K1, BM25_B = 1.2, 0.75
+BATCH_SIZE = 1000
+
+_fts_available = {}
+
+
+def backend():
+    configured = settings.SEARCH_BACKEND
+    if configured != 'auto':
+        return configured
+    name = connection.settings_dict['NAME']
+    if name not in _fts_available:
+        _fts_available[name] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLES[POST][0] in connection.introspection.table_names()
+        )
+    return FTS5 if _fts_available[name] else PYTHON
+
+
+def tokenize(text):
+    return [term[:MAX_TERM_LENGTH] for term in TERM_RE.findall(
+        text.casefold())]
+
+
+def _columns(kind, instance):
+    return [getattr(instance, column) or ''
+            for column in FTS_TABLES[kind][1]]
+
+
+def index(kind, instance):
+    """Add ``instance`` to the index, replacing its previous version."""
+    remove(kind, instance.pk)
+    if backend() == FTS5:
+        table, columns, _ = FTS_TABLES[kind]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+                f'VALUES (%s{", %s" * len(columns)})',
+                [instance.pk, *_columns(kind, instance)])
+    else:
+        SearchPosting.objects.bulk_create(_postings(kind, instance))
+
+
+def remove(kind, pk):
+    if backend() == FTS5:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLES[kind][0]} WHERE rowid = %s', [pk])
+    else:
+        SearchPosting.objects.filter(kind=kind, object_id=pk).delete()
+
+
+def index_many(kind, queryset):
+    """Add every object of ``queryset`` to the index, e.g. after imports."""
+    table, columns, _ = FTS_TABLES[kind]
+    objects = list(queryset.only('pk', *columns))
+    if not objects:
+        return
+    if backend() == FTS5:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {table} WHERE rowid = %s',
+                [[instance.pk] for instance in objects])
+            cursor.executemany(
+                f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+                f'VALUES (%s{", %s" * len(columns)})',
+                [[instance.pk, *_columns(kind, instance)]
+                 for instance in objects])
+    else:
+        SearchPosting.objects.filter(
+            kind=kind, object_id__in=[instance.pk for instance in objects]
+        ).delete()
+        SearchPosting.objects.bulk_create(
+            [posting for instance in objects
+             for posting in _postings(kind, instance)],
+            batch_size=BATCH_SIZE)
+
+
+def _postings(kind, instance):
+    frequencies = defaultdict(float)
+    length = 0
+    weights = FTS_TABLES[kind][2]
+    for text, weight in zip(_columns(kind, instance), weights):
+        terms = tokenize(text)
+        length += len(terms)
+        for term in terms:
+            frequencies[term] += weight
+    return [
+        SearchPosting(
+            kind=kind, object_id=instance.pk, term=term,
+            frequency=round(frequency), length=length)
+        for term, frequency in frequencies.items()]
+
+
+def rebuild():
+    """Refill the active index from scratch, return indexed counts."""
+    counts = {}
+    for kind, model in MODELS.items():
+        table, columns, _ = FTS_TABLES[kind]
+        if backend() == FTS5:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {table}')
+                cursor.execute(
+                    f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+                    f'SELECT id, {", ".join(columns)} '
+                    f'FROM {model._meta.db_table}')
+        else:
+            SearchPosting.objects.filter(kind=kind).delete()
+            batch = []
+            for instance in model.objects.only('pk', *columns).iterator():
+                batch.extend(_postings(kind, instance))
+                if len(batch) >= BATCH_SIZE:
+                    SearchPosting.objects.bulk_create(batch)
+                    batch = []
+            SearchPosting.objects.bulk_create(batch)
+        counts[kind] = model.objects.count()
+    return counts
+
+
+def search_ids(kind, query, limit=None):
+    """Primary keys matching every word of ``query``, best first."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    if backend() == FTS5:
+        return _fts_search(kind, terms, limit)
+    return _python_search(kind, terms, limit)
+
+
+def _fts_search(kind, terms, limit):
+    table, _, weights = FTS_TABLES[kind]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {table} WHERE {table} MATCH %s '
+            f'ORDER BY bm25({table}, {", ".join(map(str, weights))}), '
+            f'rowid DESC LIMIT %s',
+            [' '.join(f'"{term}"' for term in terms),
+             -1 if limit is None else limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _python_search(kind, terms, limit):
+    documents = defaultdict(dict)
+    postings = SearchPosting.objects.filter(
+        kind=kind, term__in=terms).values_list(
+            'object_id', 'term', 'frequency', 'length')
+    for object_id, term, frequency, length in postings.iterator():
+        documents[object_id][term] = (frequency, length)
+    if not documents:
+        return []
+    total = MODELS[kind].objects.count()
+    frequencies = defaultdict(int)
+    for found in documents.values():
+        for term in found:
+            frequencies[term] += 1
+    # The average length over the candidates stands in for the corpus
+    # average, which would need a scan of the whole index.
+    average = sum(
+        next(iter(found.values()))[1] for found in documents.values()
+    ) / len(documents) or 1
+    scores = []
+    for object_id, found in documents.items():
+        if len(found) < len(terms):
+            continue
+        score = 0
+        for term, (frequency, length) in found.items():
+            idf = math.log(1 + (total - frequencies[term] + 0.5) / (
+                frequencies[term] + 0.5))
+            score += idf * frequency * (BM25_K1 + 1) / (
+                frequency + BM25_K1 * (
+                    1 - BM25_B + BM25_B * length / average))
+        scores.append((-score, -object_id))
+    scores.sort()
+    return [-object_id for _, object_id in scores[:limit]]
+
+
+def ranked(queryset, ids):
+    """Objects of ``queryset`` with primary keys ``ids``, in that order."""
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
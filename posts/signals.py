@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import cards, counters, freshness, media, search, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, update_fields, **kwargs):
+    # An edit may move the post out of a group, whose page changes too,
+    # or replace its image, which may be left without references.
+    if instance.pk and (
+            update_fields is None
+            or {'group', 'group_id', 'image'} & set(update_fields)):
+        instance.previous_group_id, instance.previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image').first() or (None, None))
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, update_fields, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, post_count=1)
+        timeline.fan_out(instance)
+    if update_fields is None or 'text' in update_fields:
+        search.index(search.POST, instance)
+    scopes = freshness.post_scopes(instance.author_id, instance.group_id)
+    previous_group_id = getattr(instance, 'previous_group_id', None)
+    if previous_group_id is not None:
+        scopes.add(freshness.group_scope(previous_group_id))
+    freshness.touch(scopes)
+    previous_image = getattr(instance, 'previous_image', None)
+    if previous_image and previous_image != instance.image.name:
+        media.release(previous_image)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, post_count=-1)
+    search.remove(search.POST, instance.pk)
+    freshness.touch(
+        freshness.post_scopes(instance.author_id, instance.group_id))
+    media.release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+        freshness.touch_posts(Post.objects.filter(pk=instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    freshness.touch_posts(Post.objects.filter(pk=instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, follower_count=1)
+        counters.bump_author(instance.user_id, following_count=1)
+        timeline.add_author(instance.user, instance.author)
+        freshness.touch([
+            freshness.author_scope(instance.author_id),
+            freshness.author_scope(instance.user_id),
+            freshness.feed_scope(instance.user_id)])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, follower_count=-1)
+    counters.bump_author(instance.user_id, following_count=-1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    freshness.touch([
+        freshness.author_scope(instance.author_id),
+        freshness.author_scope(instance.user_id),
+        freshness.feed_scope(instance.user_id)])
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, update_fields, **kwargs):
+    # Cards show the author's username, so a rename must reach them.
+    if instance.pk and (
+            update_fields is None or 'username' in update_fields):
+        instance.previous_username = User.objects.filter(
+            pk=instance.pk).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    previous_username = getattr(instance, 'previous_username', None)
+    if previous_username and previous_username != instance.username:
+        cards.bump_versions(instance.posts.all())
+        freshness.touch_posts(instance.posts.all())
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, created, **kwargs):
+    if not created:
+        cards.bump_versions(instance.posts.all())
+        freshness.touch_posts(instance.posts.all())
+    freshness.touch([freshness.group_scope(instance.pk)])
+    search.index(search.GROUP, instance)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # Its posts lose the group label once SET_NULL has run.
+    cards.bump_versions(instance.posts.all())
+    freshness.touch_posts(instance.posts.all())
+    freshness.touch([freshness.group_scope(instance.pk)])
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    search.remove(search.GROUP, instance.pk)
@@ -0,0 +1,75 @@
+"""Content-addressed storage for post images.
+
+A saved file is named after the SHA-256 of its content and sharded into
+two levels of directories under its ``upload_to``, e.g.
+``posts/3f/a2/3fa2….jpg``, so no directory grows past a few thousand
+entries. Saving content that is already stored writes nothing and
+returns the existing name: identical uploads share one file. A file is
+referenced by every post whose ``image`` holds its name; ``posts.media``
+deletes it once no post does.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_LENGTH = 64
+SHARDS = ((0, 2), (2, 4))
+CONTENT_NAME = re.compile(
+    r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{%d}(\.\w+)?$' % HASH_LENGTH)
+
+
+def digest(chunks):
+    sha256 = hashlib.sha256()
+    for chunk in chunks:
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def content_name(name, hexdigest):
+    """Content-addressed name of ``hexdigest`` next to ``name``."""
+    directory, filename = posixpath.split(name)
+    extension = os.path.splitext(filename)[1].lower()
+    shards = [hexdigest[start:end] for start, end in SHARDS]
+    return posixpath.join(directory, *shards, hexdigest + extension)
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_NAME.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The name is decided by the content in _save().
+        return name
+
+    def _save(self, name, content):
+        name = content_name(name, digest(content.chunks()))
+        path = self.path(name)
+        if os.path.exists(path):
+            # A recent mtime keeps the shared file from being collected
+            # while the post that reuses it is being saved.
+            os.utime(path)
+            return name
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{uuid.uuid4().hex}.part'
+        try:
+            handle = os.open(
+                temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            with os.fdopen(handle, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            # Concurrent saves of the same content replace it with itself.
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
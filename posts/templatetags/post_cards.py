@@ -0,0 +1,38 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import thumbnails
+from posts.cards import render_card, render_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    return mark_safe(render_card(post, context.get('user')))
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Cards of ``posts``, each laid out like ``include/post_item.html``.
+
+    Use as ``{% post_cards page as cards %}`` and output ``{{ card }}`` in
+    the loop instead of including ``post_item.html`` for every post.
+    """
+    return [
+        mark_safe(f'\n{card}\n')
+        for card in render_cards(posts, context.get('user'))]
+
+
+@register.simple_tag
+def card_thumbnail(image):
+    """Card variants of ``image`` (see ``posts.images.card_variants``).
+
+    Returns ``None`` and queues them while they are missing.
+    """
+    if not image:
+        return None
+    variants = thumbnails.card_image(image.name)
+    if variants is None:
+        thumbnails.schedule(image.name)
+    return variants
@@ -0,0 +1,144 @@
+"""Query budget of the view tests, a pytest plugin.
+
+Every request made by a test of ``GUARDED`` has its queries recorded and
+attributed to the resolved view. The busiest request of each view is
+compared with ``query_budget.json``: the test fails when it ran more
+queries than its budget, showing a diff of the statements that
+appeared. After an intended change refresh the file with
+
+    pytest --update-query-budget posts/tests/test_views.py tests/test_post.py
+"""
+import difflib
+import json
+import os
+import re
+from contextlib import ExitStack, contextmanager
+
+import pytest
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), 'query_budget.json')
+GUARDED = ('posts/tests/test_views.py', 'tests/test_post.py')
+
+# IN lists differ in length between runs; compare their shape only.
+PLACEHOLDERS_RE = re.compile(r'%s(?:, %s)+')
+
+
+def normalize(sql):
+    return PLACEHOLDERS_RE.sub('%s, ...', sql)
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.requests = []
+        self.current = None
+
+    def started(self, sender, environ=None, **kwargs):
+        try:
+            view = resolve(environ['PATH_INFO']).view_name
+        except Resolver404:
+            view = 'not_found'
+        self.current = []
+        self.requests.append((view, self.current))
+
+    def finished(self, sender, **kwargs):
+        self.current = None
+
+    def execute(self, execute, sql, params, many, context):
+        if self.current is not None:
+            self.current.append(normalize(sql))
+        return execute(sql, params, many, context)
+
+    def busiest(self):
+        """The queries of the busiest request of every view."""
+        views = {}
+        for view, queries in self.requests:
+            if view not in views or len(queries) > len(views[view]):
+                views[view] = queries
+        return views
+
+
+@contextmanager
+def recording():
+    recorder = QueryRecorder()
+    request_started.connect(recorder.started)
+    request_finished.connect(recorder.finished)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(recorder.execute))
+            yield recorder
+    finally:
+        request_started.disconnect(recorder.started)
+        request_finished.disconnect(recorder.finished)
+
+
+def load_budget():
+    if not os.path.exists(BUDGET_FILE):
+        return {}
+    with open(BUDGET_FILE, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def regressions(test, observed, budget):
+    messages = []
+    for view, queries in sorted(observed.items()):
+        allowed = budget.get(test, {}).get(view)
+        if allowed is None:
+            messages.append(
+                f'{view}: {len(queries)} queries, no budget yet')
+        elif len(queries) > len(allowed):
+            diff = difflib.unified_diff(
+                allowed, queries, 'budget', 'now', lineterm='', n=0)
+            messages.append(
+                f'{view}: {len(queries)} queries, budget '
+                f'{len(allowed)}\n' + '\n'.join(diff))
+    return messages
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--update-query-budget', action='store_true',
+        help='Записать число запросов view-тестов в query_budget.json')
+
+
+def pytest_configure(config):
+    config.query_budget = load_budget()
+    config.query_budget_observed = {}
+
+
+# An old-style wrapper: the new ones need pytest 8, the pins are older.
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    if item.nodeid.split('::')[0] not in GUARDED:
+        yield
+        return
+    with recording() as recorder:
+        outcome = yield
+    if outcome.excinfo is not None:
+        return
+    observed = recorder.busiest()
+    config = item.config
+    if config.getoption('update_query_budget'):
+        config.query_budget_observed[item.nodeid] = observed
+        return
+    messages = regressions(item.nodeid, observed, config.query_budget)
+    if messages:
+        pytest.fail(
+            'Запросов больше, чем в query_budget.json '
+            '(pytest --update-query-budget, если так и задумано):\n'
+            + '\n'.join(messages), pytrace=False)
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if not config.getoption('update_query_budget'):
+        return
+    budget = load_budget()
+    budget.update(config.query_budget_observed)
+    with open(BUDGET_FILE, 'w', encoding='utf-8') as file:
+        json.dump(budget, file, ensure_ascii=False, indent=2, sort_keys=True)
+        file.write('\n')
@@ -0,0 +1,150 @@
+import gzip
+import json
+
+import brotli
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.paginator import COMMENTS_PER_PAGE
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Амалия')
+        self.reader = User.objects.create_user(username='Русик')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.posts = [
+            Post.objects.create(
+                text=f'пост {i}', author=self.author,
+                group=self.group if i % 2 else None)
+            for i in range(13)]
+        self.post = self.posts[-1]
+        Comment.objects.create(post=self.post, author=self.reader, text='c')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        return response, json.loads(response.content)
+
+    def test_feeds_page_with_cursor(self):
+        for url, expected in (
+            (reverse('posts:api_index'), self.posts),
+            (reverse('posts:api_group', kwargs={'slug': 'group'}),
+             [post for post in self.posts if post.group_id]),
+            (reverse('posts:api_profile', kwargs={'username': 'Амалия'}),
+             self.posts),
+            (reverse('posts:api_follow_index'), self.posts),
+        ):
+            with self.subTest(url=url):
+                ids, cursor = [], None
+                while True:
+                    params = {'fields': 'id', 'limit': 5}
+                    if cursor:
+                        params['cursor'] = cursor
+                    _, data = self.get(url, **params)
+                    ids += [post['id'] for post in data['results']]
+                    cursor = data['next']
+                    if not cursor:
+                        break
+                self.assertEqual(
+                    ids, [post.pk for post in reversed(expected)])
+
+    def test_fields_select_payload(self):
+        _, data = self.get(reverse('posts:api_index'))
+        self.assertEqual(data['results'][0], {
+            'id': self.post.pk,
+            'text': 'пост 12',
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': 'Амалия',
+            'group': None,
+            'image': None,
+            'comment_count': 1,
+        })
+        _, data = self.get(reverse('posts:api_index'), fields='text,author')
+        self.assertEqual(
+            data['results'][0], {'text': 'пост 12', 'author': 'Амалия'})
+        response, data = self.get(reverse('posts:api_index'), fields='x')
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_with_comments(self):
+        _, data = self.get(reverse(
+            'posts:api_post',
+            kwargs={'username': 'Амалия', 'post_id': self.post.pk}),
+            fields='id')
+        self.assertEqual(data['post'], {'id': self.post.pk})
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']], ['c'])
+        self.assertEqual(data['comments'][0]['author'], 'Русик')
+        self.assertIsNone(data['next'])
+
+    def test_comments_are_paginated(self):
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.reader, text=f'c{i}')
+            for i in range(COMMENTS_PER_PAGE))
+        url = reverse(
+            'posts:api_post',
+            kwargs={'username': 'Амалия', 'post_id': self.post.pk})
+        _, first = self.get(url)
+        self.assertEqual(len(first['comments']), COMMENTS_PER_PAGE)
+        _, second = self.get(url, cursor=first['next'])
+        self.assertEqual(len(second['comments']), 1)
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            {comment['id'] for comment in first['comments'] + second[
+                'comments']},
+            set(self.post.comments.values_list('id', flat=True)))
+
+    def test_unchanged_pages_are_served_from_cache(self):
+        url = reverse('posts:api_index')
+        _, first = self.get(url, fields='id')
+        with CaptureQueriesContext(connection) as queries:
+            _, again = self.get(url, fields='id')
+        self.assertEqual(again, first)
+        self.assertFalse([
+            query for query in queries
+            if 'FROM "posts_post"' in query['sql']])
+        post = Post.objects.create(text='новый', author=self.author)
+        _, data = self.get(url, fields='id')
+        self.assertEqual(data['results'][0], {'id': post.pk})
+
+    def test_errors(self):
+        response, _ = self.get(reverse(
+            'posts:api_post',
+            kwargs={'username': 'Русик', 'post_id': self.post.pk}))
+        self.assertEqual(response.status_code, 404)
+        response = Client().get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_gzip_and_etag(self):
+        response = self.client.get(
+            reverse('posts:api_index'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            len(json.loads(gzip.decompress(response.content))['results']),
+            10)
+        response = self.client.get(
+            reverse('posts:api_index'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_brotli_is_preferred(self):
+        response = self.client.get(
+            reverse('posts:api_index'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(
+            len(json.loads(brotli.decompress(response.content))['results']),
+            10)
+        response = self.client.get(
+            reverse('posts:api_index'), HTTP_ACCEPT_ENCODING='br',
+            HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
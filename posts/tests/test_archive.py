@@ -0,0 +1,84 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import archive, thumbnails
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(THUMBNAIL_WORKERS=0, MEDIA_ROOT=MEDIA_ROOT)
+class ArchiveTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        thumbnails.shutdown()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Амалия')
+        other = User.objects.create_user(username='Русик')
+        self.image = os.urandom(archive.CHUNK_SIZE * 5)
+        self.post = Post.objects.create(
+            text='капучино', author=self.user,
+            image=SimpleUploadedFile('big.gif', self.image, 'image/gif'))
+        Post.objects.create(text='латте', author=self.user)
+        Post.objects.create(text='чужой', author=other)
+        Comment.objects.create(post=self.post, author=self.user, text='мой')
+        Comment.objects.create(post=self.post, author=other, text='чужой')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_archive_is_streamed(self):
+        response = self.client.get(reverse('posts:archive'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn('attachment', response['Content-Disposition'])
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 5)
+        self.assertLessEqual(
+            max(map(len, chunks)), archive.CHUNK_SIZE + 1024)
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            posts = [
+                json.loads(line)
+                for line in zip_file.read('posts.ndjson').splitlines()]
+            comments = [
+                json.loads(line)
+                for line in zip_file.read('comments.ndjson').splitlines()]
+            image = zip_file.read(self.post.image.name)
+        self.assertEqual([post['text'] for post in posts],
+                         ['капучино', 'латте'])
+        self.assertEqual([comment['text'] for comment in comments], ['мой'])
+        self.assertEqual(image, self.image)
+
+    def test_missing_image_is_skipped(self):
+        os.remove(self.post.image.path)
+        response = self.client.get(reverse('posts:archive'))
+        content = b''.join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as zip_file:
+            self.assertEqual(
+                zip_file.namelist(), ['posts.ndjson', 'comments.ndjson'])
+
+    def test_anonymous_is_redirected_to_login(self):
+        response = Client().get(reverse('posts:archive'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response['Location'])
+
+    def test_own_profile_links_to_archive(self):
+        url = reverse('posts:profile', kwargs={'username': 'Амалия'})
+        self.assertContains(self.client.get(url), reverse('posts:archive'))
+        url = reverse('posts:profile', kwargs={'username': 'Русик'})
+        self.assertNotContains(
+            self.client.get(url), reverse('posts:archive'))
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from posts import caching
+from yatube.cache import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(location, {})
+        self.another_worker = SQLiteCache(location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_values_are_shared_between_instances(self):
+        self.cache.set('key', {'posts': [1, 2]})
+        self.assertEqual(self.another_worker.get('key'), {'posts': [1, 2]})
+        self.assertEqual(
+            self.another_worker.get_many(['key', 'missing']),
+            {'key': {'posts': [1, 2]}})
+        self.another_worker.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_add_incr_and_expiry(self):
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.another_worker.add('counter', 5))
+        self.assertEqual(self.another_worker.incr('counter', 2), 3)
+        self.cache.set('short', 'value', 0.01)
+        time.sleep(0.02)
+        self.assertFalse(self.cache.has_key('short'))
+        self.assertTrue(self.cache.add('short', 'new'))
+
+
+@override_settings(CACHE_STATS_FLUSH_INTERVAL=0)
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_value_is_computed_once_and_stats_are_counted(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'html'
+
+        for _ in range(3):
+            self.assertEqual(
+                caching.get_or_compute('feed:1', compute, 60), 'html')
+        self.assertEqual(len(calls), 1)
+        stats = caching.shared_stats()
+        self.assertEqual(stats[('feed', 'miss')], 1)
+        self.assertEqual(stats[('feed', 'hit')], 2)
+
+    def test_value_close_to_expiry_is_refreshed_by_one_reader(self):
+        cache.set('feed:2', ('old', 1000, time.time() + 1), 60)
+        cache.add('feed:2:lock', 1, 10)
+        self.assertEqual(
+            caching.get_or_compute('feed:2', lambda: 'new', 60), 'old')
+        cache.delete('feed:2:lock')
+        self.assertEqual(
+            caching.get_or_compute('feed:2', lambda: 'new', 60), 'new')
+
+    def test_miss_waits_for_the_worker_holding_the_lock(self):
+        cache.add('feed:3:lock', 1, 10)
+
+        def other_worker_sets(seconds):
+            cache.set('feed:3', ('theirs', 0.1, time.time() + 60), 60)
+
+        with mock.patch('posts.caching.time.sleep', other_worker_sets):
+            self.assertEqual(
+                caching.get_or_compute('feed:3', lambda: 'mine', 60),
+                'theirs')
+            self.assertEqual(caching.get_many_or_compute(
+                {'feed:3': lambda: 'mine'}, 60), {'feed:3': 'theirs'})
+
+    @override_settings(CACHE_MISS_WAIT=0)
+    def test_miss_computes_after_a_vain_wait(self):
+        cache.add('feed:4:lock', 1, 10)
+        self.assertEqual(
+            caching.get_or_compute('feed:4', lambda: 'mine', 60), 'mine')
+        self.assertEqual(cache.get('feed:4')[0], 'mine')
+
+    def test_stats_of_separate_flushes_are_kept(self):
+        caching._flush({('feed', 'hit'): 2})
+        caching._flush({('card', 'miss'): 1, ('feed', 'hit'): 1})
+        stats = caching.shared_stats()
+        self.assertEqual(stats[('feed', 'hit')], 3)
+        self.assertEqual(stats[('card', 'miss')], 1)
+        self.assertEqual(stats[('card', 'hit')], 0)
@@ -0,0 +1,98 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.cards import card_key
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Амалия')
+        self.reader = User.objects.create_user(username='Русик')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(
+            text='капучино', author=self.author, group=self.group)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.edit_url = reverse(
+            'posts:post_edit',
+            kwargs={'username': 'Амалия', 'post_id': self.post.pk})
+
+    def test_edit_link_is_shown_to_author_only(self):
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, self.edit_url)
+        self.assertIn(card_key(self.post), cache)
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertNotContains(response, self.edit_url)
+
+    def test_feeds_share_the_card_fragment(self):
+        self.reader_client.get(reverse('posts:index'))
+        cache.set(card_key(self.post), ('из кэша', 0, time.time() + 60))
+        for url in (
+            reverse('posts:group', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'Амалия'}),
+        ):
+            with self.subTest(url=url):
+                self.assertContains(self.reader_client.get(url), 'из кэша')
+
+    def test_edit_and_comment_invalidate_only_affected_card(self):
+        other = Post.objects.create(text='круассан', author=self.reader)
+        self.reader_client.get(reverse('posts:index'))
+        other_key = card_key(other)
+        self.author_client.post(self.edit_url, data={'text': 'латте'})
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertContains(response, 'латте')
+        self.assertNotContains(response, 'капучино')
+        Comment.objects.create(post=self.post, author=self.reader, text='c')
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 1')
+        other.refresh_from_db()
+        self.assertEqual(card_key(other), other_key)
+
+    def test_group_rename_invalidates_its_cards(self):
+        self.reader_client.get(reverse('posts:index'))
+        self.group.title = 'Новая группа'
+        self.group.save()
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertContains(response, '#Новая группа')
+
+    def test_author_rename_invalidates_their_cards(self):
+        other = Post.objects.create(text='круассан', author=self.reader)
+        self.reader_client.get(reverse('posts:index'))
+        other_key = card_key(other)
+        self.author.username = 'Амалия_новая'
+        self.author.save()
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertContains(response, '@Амалия_новая')
+        self.assertNotContains(response, '@Амалия<')
+        other.refresh_from_db()
+        self.assertEqual(card_key(other), other_key)
+
+    def test_post_cards_match_the_include_loop(self):
+        Post.objects.create(text='круассан', author=self.reader)
+        posts = Post.objects.order_by('-pub_date')
+        include = Template(
+            '{% for post in posts %}'
+            '{% include "include/post_item.html" %}{% endfor %}')
+        single_pass = Template(
+            '{% load post_cards %}{% post_cards posts as cards %}'
+            '{% for card in cards %}{{ card }}{% endfor %}')
+        for user in (None, self.author, self.reader):
+            for cached in (False, True):
+                with self.subTest(user=user, cached=cached):
+                    if not cached:
+                        cache.clear()
+                    context = {'posts': posts, 'user': user}
+                    rendered = single_pass.render(Context(context))
+                    self.assertEqual(
+                        rendered, include.render(Context(context)))
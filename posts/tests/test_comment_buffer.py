@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import comment_buffer
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(
+    COMMENT_BUFFER_ENABLED=True, COMMENT_BUFFER_FLUSH_INTERVAL=0,
+    COMMENT_BUFFER_MAX_SIZE=3)
+class CommentBufferTests(TestCase):
+    def setUp(self):
+        comment_buffer._queue.clear()
+        self.author = User.objects.create_user(username='Амалия')
+        self.reader = User.objects.create_user(username='Русик')
+        self.post = Post.objects.create(text='пост', author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.post_url = reverse(
+            'posts:post',
+            kwargs={'username': 'Амалия', 'post_id': self.post.pk})
+        self.comment_url = reverse(
+            'posts:add_comment',
+            kwargs={'username': 'Амалия', 'post_id': self.post.pk})
+
+    def tearDown(self):
+        comment_buffer._queue.clear()
+
+    def comment(self, text, client=None):
+        return (client or self.client).post(self.comment_url, {'text': text})
+
+    def test_comment_is_queued_and_shown_to_its_author(self):
+        etag = self.client.get(self.post_url)['ETag']
+        self.comment('первый')
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(comment_buffer.stats()['depth'], 1)
+        response = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'первый')
+        self.assertContains(response, 'публикуется')
+        other = Client()
+        other.force_login(self.author)
+        self.assertNotContains(other.get(self.post_url), 'первый')
+
+    def test_flush_writes_comments_and_counters(self):
+        self.comment('первый')
+        self.comment('второй')
+        self.assertEqual(comment_buffer.flush(), 2)
+        self.assertEqual(
+            list(Comment.objects.order_by('id').values_list(
+                'text', flat=True)),
+            ['первый', 'второй'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        response = self.client.get(self.post_url)
+        self.assertContains(response, 'первый', count=1)
+        self.assertNotContains(response, 'публикуется')
+        self.assertEqual(self.client.session['pending_comments'], [])
+
+    def test_full_queue_is_flushed(self):
+        for text in ('a', 'b', 'c'):
+            self.comment(text)
+        self.assertEqual(Comment.objects.count(), 3)
+        stats = comment_buffer.stats()
+        self.assertEqual(stats['depth'], 0)
+        self.assertGreaterEqual(stats['max_depth'], 3)
+
+    def test_locked_database_keeps_the_queue(self):
+        self.comment('первый')
+        with mock.patch.object(
+                Comment.objects, 'bulk_create',
+                side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                comment_buffer.flush()
+        self.assertEqual(comment_buffer.stats()['depth'], 1)
+        comment_buffer.flush()
+        self.assertEqual(Comment.objects.get().text, 'первый')
+
+    def test_comments_of_deleted_post_are_dropped(self):
+        self.comment('первый')
+        self.post.delete()
+        self.assertEqual(comment_buffer.flush(), 0)
+        self.assertFalse(Comment.objects.exists())
+
+    @override_settings(COMMENT_BUFFER_ENABLED=False)
+    def test_disabled_buffer_saves_at_once(self):
+        self.comment('первый')
+        self.assertEqual(Comment.objects.get().text, 'первый')
+        self.assertEqual(comment_buffer.stats()['depth'], 0)
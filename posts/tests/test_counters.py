@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.counters import author_stats
+from posts.models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Амалия')
+        self.author = User.objects.create_user(username='Стас')
+        self.post = Post.objects.create(text='a', author=self.author)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_post_counter_follows_create_and_delete(self):
+        Post.objects.create(text='b', author=self.author)
+        self.assertEqual(author_stats(self.author).post_count, 2)
+        self.post.delete()
+        self.assertEqual(author_stats(self.author).post_count, 1)
+
+    def test_comment_counter_follows_views_and_delete(self):
+        self.authorized_client.post(
+            reverse(
+                'posts:add_comment',
+                kwargs={'username': 'Стас', 'post_id': self.post.pk}),
+            data={'text': 'com'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        Comment.objects.get().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_drifted_counters_do_not_go_negative(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='c')
+        Post.objects.update(comment_count=0)
+        AuthorStats.objects.update(post_count=0)
+        comment.delete()
+        self.post.delete()
+        self.assertEqual(author_stats(self.author).post_count, 0)
+        Follow.objects.create(user=self.user, author=self.author)
+        AuthorStats.objects.update(follower_count=0, following_count=0)
+        Follow.objects.get().delete()
+        self.assertEqual(author_stats(self.author).follower_count, 0)
+        self.assertEqual(author_stats(self.user).following_count, 0)
+
+    def test_editing_post_keeps_comment_counter(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.user, text='c')
+        stale.text = 'edited'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.text, 'edited')
+
+    def test_follow_counters_follow_views(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'Стас'}))
+        self.assertEqual(author_stats(self.author).follower_count, 1)
+        self.assertEqual(author_stats(self.user).following_count, 1)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'Стас'}))
+        self.assertEqual(author_stats(self.author).follower_count, 0)
+        self.assertEqual(author_stats(self.user).following_count, 0)
+
+    def test_reconcile_counters_repairs_drift(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Comment.objects.create(post=self.post, author=self.user, text='c')
+        Post.objects.update(comment_count=7)
+        AuthorStats.objects.filter(user=self.author).update(
+            post_count=5, follower_count=0)
+        AuthorStats.objects.filter(user=self.user).delete()
+        call_command('reconcile_counters', stdout=open('/dev/null', 'w'))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual((stats.post_count, stats.follower_count), (1, 1))
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).following_count, 1)
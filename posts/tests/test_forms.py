@@ -1,22 +1,26 @@
+import hashlib
 import shutil
 import tempfile
 
-from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from posts import thumbnails
 from posts.models import Group, Post
+from posts.storage import content_name
 
 User = get_user_model()
 
+MEDIA_ROOT = tempfile.mkdtemp()
 
+
+@override_settings(THUMBNAIL_WORKERS=0, MEDIA_ROOT=MEDIA_ROOT)
 class PostsFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
         cls.small_gif = (
             b'\x47\x49\x46\x38\x39\x61\x02\x00'
             b'\x01\x00\x80\x00\x00\x00\x00\x00'
@@ -33,7 +37,8 @@ class PostsFormTests(TestCase):
 
     @classmethod
     def tearDownClass(cls):
-        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        thumbnails.shutdown()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
         super().tearDownClass()
 
     def setUp(self):
@@ -75,7 +80,9 @@ class PostsFormTests(TestCase):
                 Post.objects.filter(
                     text='gagagaga',
                     author=self.user,
-                    image='posts/small.gif'
+                    image=content_name(
+                        'posts/small.gif',
+                        hashlib.sha256(self.small_gif).hexdigest())
                 ).exists()
             )
 
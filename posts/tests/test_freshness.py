@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import freshness
+from posts.models import Comment, FeedState, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='Амалия')
+        self.reader = User.objects.create_user(username='Русик')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.other_group = Group.objects.create(title='Другая', slug='other')
+        self.post = Post.objects.create(
+            text='капучино', author=self.author, group=self.group)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group', kwargs={'slug': 'group'}),
+            'other_group': reverse('posts:group', kwargs={'slug': 'other'}),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': 'Амалия'}),
+            'post': reverse(
+                'posts:post',
+                kwargs={'username': 'Амалия', 'post_id': self.post.pk}),
+            'follow': reverse('posts:follow_index'),
+        }
+
+    def etags(self):
+        return {
+            name: self.client.get(url)['ETag']
+            for name, url in self.urls.items()}
+
+    def changed(self, before):
+        after = self.etags()
+        return {name for name in before if before[name] != after[name]}
+
+    def test_repeat_visit_is_not_modified(self):
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(url)
+                self.assertIn('Last-Modified', response)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+                self.assertTrue(queries)
+                self.assertFalse([
+                    query for query in queries
+                    if query['sql'].startswith('SELECT "posts_post"."id"')])
+
+    def test_etag_depends_on_user(self):
+        etag = self.client.get(self.urls['index'])['ETag']
+        self.assertNotEqual(Client().get(self.urls['index'])['ETag'], etag)
+
+    def test_new_post_changes_its_pages_only(self):
+        before = self.etags()
+        Post.objects.create(text='латте', author=self.author, group=self.group)
+        self.assertEqual(
+            self.changed(before),
+            {'index', 'group', 'profile', 'post', 'follow'})
+
+    def test_post_of_unfollowed_author_keeps_follow_feed(self):
+        other = User.objects.create_user(username='Стас')
+        before = self.etags()
+        Post.objects.create(text='раф', author=other)
+        self.assertEqual(self.changed(before), {'index'})
+
+    @override_settings(FOLLOW_FEED_FANOUT_THRESHOLD=1)
+    def test_celebrity_post_changes_follow_feed(self):
+        before = self.etags()
+        Post.objects.create(text='латте', author=self.author)
+        self.assertIn('follow', self.changed(before))
+
+    def test_comment_changes_post_and_feeds(self):
+        before = self.etags()
+        Comment.objects.create(post=self.post, author=self.reader, text='c')
+        self.assertEqual(
+            self.changed(before),
+            {'index', 'group', 'profile', 'post', 'follow'})
+
+    def test_posts_and_comments_do_not_write_follower_feeds(self):
+        feed = FeedState.objects.filter(
+            scope=freshness.feed_scope(self.reader.pk))
+        version = feed.get().version
+        post = Post.objects.create(text='латте', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='c')
+        post.delete()
+        self.assertEqual(feed.get().version, version)
+
+    def test_moving_post_changes_both_groups(self):
+        before = self.etags()
+        self.post.group = self.other_group
+        self.post.save()
+        self.assertIn('group', self.changed(before))
+        self.assertIn('other_group', self.changed(before))
+
+    def test_group_rename_changes_its_posts_pages(self):
+        before = self.etags()
+        self.group.title = 'Новая группа'
+        self.group.save()
+        self.assertEqual(
+            self.changed(before),
+            {'index', 'group', 'profile', 'post', 'follow'})
+
+    def test_unfollow_changes_follow_feed_and_profile(self):
+        before = self.etags()
+        Follow.objects.all().delete()
+        self.assertEqual(self.changed(before), {'profile', 'post', 'follow'})
+
+    def test_missing_pages_are_not_found(self):
+        for url in (
+            reverse('posts:group', kwargs={'slug': 'nope'}),
+            reverse('posts:profile', kwargs={'username': 'nope'}),
+            reverse('posts:post',
+                    kwargs={'username': 'Амалия', 'post_id': 999}),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
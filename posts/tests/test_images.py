@@ -0,0 +1,115 @@
+import hashlib
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images, thumbnails
+from posts.models import Post
+from posts.storage import content_name
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def jpeg(size, orientation=None):
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[images.ORIENTATION] = orientation
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(THUMBNAIL_WORKERS=0, MEDIA_ROOT=MEDIA_ROOT,
+                   IMAGE_MAX_SIZE=400)
+class ImageProcessingTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        thumbnails.shutdown()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Амалия')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def upload(self, name, content):
+        self.client.post(reverse('posts:new_post'), {
+            'text': name,
+            'image': SimpleUploadedFile(name, content, 'image/jpeg')})
+        return Post.objects.get(text=name)
+
+    def test_large_uploads_are_oriented_and_scaled_down(self):
+        post = self.upload('phone.jpg', jpeg((1200, 600), orientation=6))
+        with open(post.image.path, 'rb') as file:
+            hexdigest = hashlib.sha256(file.read()).hexdigest()
+        self.assertEqual(
+            post.image.name, content_name('posts/phone.jpg', hexdigest))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (200, 400))
+            self.assertNotIn(images.ORIENTATION, image.getexif())
+
+    def test_small_uploads_are_stored_as_they_are(self):
+        content = jpeg((300, 100))
+        post = self.upload('small.jpg', content)
+        with open(post.image.path, 'rb') as file:
+            self.assertEqual(file.read(), content)
+
+    def test_animations_are_scaled_frame_by_frame(self):
+        for format in ('GIF', 'WEBP'):
+            with self.subTest(format=format):
+                frames = [
+                    Image.new('RGB', (800, 100), color)
+                    for color in ((200, 30, 30), (30, 30, 200))]
+                buffer = io.BytesIO()
+                frames[0].save(
+                    buffer, format, save_all=True, append_images=frames[1:],
+                    duration=[100, 200], loop=0)
+                post = self.upload(
+                    f'moving.{format.lower()}', buffer.getvalue())
+                with Image.open(post.image.path) as image:
+                    self.assertEqual(image.format, format)
+                    self.assertEqual(image.n_frames, 2)
+                    self.assertEqual(image.size, (400, 50))
+
+    def test_mpo_uploads_keep_their_first_picture(self):
+        pictures = [
+            Image.new('RGB', (300, 100), color)
+            for color in ((200, 30, 30), (30, 30, 200))]
+        buffer = io.BytesIO()
+        pictures[0].save(
+            buffer, 'MPO', save_all=True, append_images=pictures[1:])
+        post = self.upload('stereo.jpg', buffer.getvalue())
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (300, 100))
+            self.assertGreater(image.getpixel((0, 0))[0], 150)
+
+    def test_card_shows_variants_with_srcset(self):
+        post = self.upload('card.jpg', jpeg((1200, 600)))
+        url = thumbnails.generate(post.image.name)
+        variants = thumbnails.card_image(post.image.name)
+        self.assertEqual(variants['src'], url)
+        for width, height in ((480, 170), (960, 339)):
+            for extension in ('jpg', 'webp'):
+                name = images.variant_name(post.image.name, width, extension)
+                with self.subTest(name=name), default_storage.open(
+                        name) as file, Image.open(file) as image:
+                    self.assertEqual(image.size, (width, height))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, variants['srcset'])
+        self.assertContains(response, 'type="image/webp"')
+        self.assertNotContains(response, 'Изображение обрабатывается')
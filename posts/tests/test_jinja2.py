@@ -0,0 +1,72 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+JINJA2_VIEWS = {
+    view: 'jinja2' for view in (
+        'posts:index', 'posts:group', 'posts:profile', 'posts:post',
+        'posts:comments', 'posts:follow_index')}
+
+
+def normalize(html):
+    html = re.sub(r'name="csrfmiddlewaretoken" value="[^"]*"', '', html)
+    return re.sub(r'\s+', ' ', re.sub(r'>\s+<', '><', html)).strip()
+
+
+class Jinja2PortTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Амалия')
+        self.reader = User.objects.create_user(username='Русик')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='О кофе')
+        for number in range(12):
+            post = Post.objects.create(
+                text=f'Пост {number}\nвторая строка', author=self.author,
+                group=group if number % 2 else None)
+        for number in range(25):
+            Comment.objects.create(
+                post=post, author=self.reader, text=f'Комментарий {number}')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.post = post
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_ported_pages_render_the_same_html(self):
+        post = {'username': 'Амалия', 'post_id': self.post.pk}
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'Амалия'}),
+            reverse('posts:post', kwargs=post),
+            reverse('posts:comments', kwargs=post),
+            reverse('posts:follow_index'),
+        ]
+        for client in (Client(), self.author_client, self.reader_client):
+            for url in urls:
+                if url == reverse('posts:follow_index') and (
+                        client is not self.reader_client):
+                    continue
+                with self.subTest(url=url):
+                    django = client.get(url)
+                    with override_settings(VIEW_TEMPLATE_ENGINES=JINJA2_VIEWS):
+                        jinja2 = client.get(url)
+                    self.assertEqual(jinja2.status_code, 200)
+                    # Only form widgets come from the Django engine.
+                    self.assertEqual([
+                        template.name for template in jinja2.templates
+                        if not template.name.startswith('django/forms/')
+                    ], [])
+                    self.assertEqual(
+                        normalize(jinja2.content.decode()),
+                        normalize(django.content.decode()))
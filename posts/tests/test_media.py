@@ -0,0 +1,128 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import media, thumbnails
+from posts.models import Post
+from posts.storage import content_name
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def other_gif():
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 1), (200, 30, 30)).save(buffer, 'GIF')
+    return buffer.getvalue()
+
+
+OTHER_GIF = other_gif()
+
+
+def gif(content=SMALL_GIF, name='small.gif'):
+    return SimpleUploadedFile(name, content, 'image/gif')
+
+
+def sharded(content, name='posts/small.gif'):
+    return content_name(name, hashlib.sha256(content).hexdigest())
+
+
+class MediaTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=root, MEDIA_GC_GRACE_SECONDS=0, THUMBNAIL_WORKERS=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # TestCase never commits, so run the on_commit callbacks now.
+        patcher = mock.patch(
+            'posts.media.transaction.on_commit', lambda func: func())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        self.user = User.objects.create_user(username='Амалия')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def exists(self, name):
+        return media.storage.exists(name)
+
+    def call(self, command, **options):
+        call_command(command, stdout=io.StringIO(), **options)
+
+    def test_identical_uploads_share_one_file(self):
+        first = Post.objects.create(text='a', author=self.user, image=gif())
+        second = Post.objects.create(
+            text='b', author=self.user, image=gif(name='copy.gif'))
+        self.assertEqual(first.image.name, sharded(SMALL_GIF))
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(list(media.stored_names('posts')), [
+            first.image.name])
+
+    def test_released_image_is_deleted_when_unreferenced(self):
+        post = Post.objects.create(text='a', author=self.user, image=gif())
+        other = Post.objects.create(text='b', author=self.user, image=gif())
+        name = post.image.name
+        thumbnails.generate(name)
+        variants = thumbnails.card_image(name)['files']
+        post.delete()
+        self.assertTrue(self.exists(name))
+        self.client.post(
+            reverse('posts:post_edit', args=[self.user.username, other.id]),
+            {'text': 'b', 'image': gif(OTHER_GIF)})
+        other.refresh_from_db()
+        self.assertEqual(other.image.name, sharded(OTHER_GIF))
+        self.assertFalse(self.exists(name))
+        self.assertIsNone(thumbnails.card_image(name))
+        for variant in variants:
+            self.assertFalse(self.exists(variant))
+
+    def test_recent_files_are_kept(self):
+        post = Post.objects.create(text='a', author=self.user, image=gif())
+        with self.settings(MEDIA_GC_GRACE_SECONDS=60):
+            post.delete()
+            self.assertTrue(self.exists(post.image.name))
+            self.call('gc_media')
+            self.assertTrue(self.exists(post.image.name))
+        self.call('gc_media')
+        self.assertFalse(self.exists(post.image.name))
+
+    def test_migrate_media_moves_legacy_names(self):
+        legacy = os.path.join(media.storage.location, 'posts', 'legacy.gif')
+        os.makedirs(os.path.dirname(legacy))
+        with open(legacy, 'wb') as file:
+            file.write(SMALL_GIF)
+        posts = [
+            Post.objects.create(
+                text=text, author=self.user, image='posts/legacy.gif')
+            for text in 'ab']
+        self.call('migrate_media', workers=2)
+        name = sharded(SMALL_GIF)
+        self.assertEqual(
+            set(Post.objects.values_list('image', flat=True)), {name})
+        self.assertFalse(os.path.exists(legacy))
+        self.assertTrue(self.exists(name))
+        for post in posts:
+            version = post.version
+            post.refresh_from_db()
+            self.assertEqual(post.version, version + 1)
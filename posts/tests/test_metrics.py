@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1, REQUEST_METRICS_SLOW_MS=1e6)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='Амалия')
+        Post.objects.create(text='капучино', author=author)
+
+    def get_index(self):
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            response = Client().get(reverse('posts:index'))
+        return response, logs.records[0].metrics
+
+    def test_sampled_request_is_measured(self):
+        response, metrics = self.get_index()
+        self.assertEqual(metrics['view'], 'posts:index')
+        self.assertEqual(metrics['status'], 200)
+        self.assertGreater(metrics['queries'], 0)
+        self.assertGreater(metrics['template_ms'], 0)
+        self.assertEqual(metrics['cache'], {'miss': 1})
+        self.assertIn(
+            f'db;dur={metrics["query_ms"]};desc="{metrics["queries"]} '
+            'queries"', response['Server-Timing'])
+        _, metrics = self.get_index()
+        self.assertEqual(metrics['cache'], {'hit': 1})
+
+    def test_comment_buffer_stats_are_logged_when_enabled(self):
+        _, metrics = self.get_index()
+        self.assertNotIn('comment_buffer', metrics)
+        with self.settings(COMMENT_BUFFER_ENABLED=True):
+            _, metrics = self.get_index()
+        self.assertEqual(
+            set(metrics['comment_buffer']),
+            {'depth', 'max_depth', 'flushes', 'written', 'dropped',
+             'last_flush_ms', 'max_flush_ms'})
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_request_is_logged_only_when_slow(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+        with self.settings(REQUEST_METRICS_SLOW_MS=0):
+            with self.assertLogs('yatube.requests', 'WARNING') as logs:
+                Client().get(reverse('posts:index'))
+        self.assertFalse(logs.records[0].metrics['sampled'])
+        self.assertNotIn('queries', logs.records[0].metrics)
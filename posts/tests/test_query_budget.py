@@ -0,0 +1,22 @@
+from django.test import SimpleTestCase
+
+from posts.tests.query_budget import normalize, regressions
+
+
+class QueryBudgetTests(SimpleTestCase):
+    def test_in_lists_are_normalized(self):
+        self.assertEqual(
+            normalize('SELECT 1 WHERE id IN (%s, %s, %s) AND a = %s'),
+            'SELECT 1 WHERE id IN (%s, ...) AND a = %s')
+
+    def test_only_growth_is_reported(self):
+        budget = {'test': {'posts:index': ['SELECT a', 'SELECT b']}}
+        self.assertEqual(
+            regressions('test', {'posts:index': ['SELECT a']}, budget), [])
+        message, = regressions(
+            'test', {'posts:index': ['SELECT a', 'SELECT b', 'SELECT c']},
+            budget)
+        self.assertIn('3 queries, budget 2', message)
+        self.assertIn('+SELECT c', message)
+        message, = regressions('test', {'posts:group': []}, budget)
+        self.assertIn('no budget yet', message)
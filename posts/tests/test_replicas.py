@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, router
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.replicas import COOKIE_NAME, replicate
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='Амалия')
+        self.post = Post.objects.create(text='первый', author=self.author)
+        replicate()
+        self.index = reverse('posts:index')
+
+    def test_feeds_read_from_replica(self):
+        Post.objects.create(text='ещё не скопирован', author=self.author)
+        for url in (
+            self.index,
+            reverse('posts:profile', kwargs={'username': 'Амалия'}),
+        ):
+            with self.subTest(url=url):
+                response = Client().get(url)
+                self.assertContains(response, 'первый')
+                self.assertNotContains(response, 'ещё не скопирован')
+        replicate()
+        self.assertContains(Client().get(self.index), 'ещё не скопирован')
+
+    def test_writer_reads_own_writes_from_primary(self):
+        client = Client()
+        client.force_login(self.author)
+        response = client.post(
+            reverse('posts:add_comment', kwargs={
+                'username': 'Амалия', 'post_id': self.post.pk}),
+            {'text': 'свежий комментарий'})
+        self.assertIn(COOKIE_NAME, response.cookies)
+        response = client.get(reverse('posts:post', kwargs={
+            'username': 'Амалия', 'post_id': self.post.pk}))
+        self.assertContains(response, 'свежий комментарий')
+        client.cookies.pop(COOKIE_NAME)
+        response = client.get(reverse('posts:post', kwargs={
+            'username': 'Амалия', 'post_id': self.post.pk}))
+        self.assertNotContains(response, 'свежий комментарий')
+
+    def test_comment_on_post_not_replicated_yet(self):
+        post = Post.objects.create(
+            text='ещё не скопирован', author=self.author)
+        client = Client()
+        client.force_login(self.author)
+        response = client.post(
+            reverse('posts:post', kwargs={
+                'username': 'Амалия', 'post_id': post.pk}),
+            {'text': 'первый комментарий'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(post.comments.exists())
+
+    def test_other_code_uses_primary(self):
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_write(Post), DEFAULT_DB_ALIAS)
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
@@ -0,0 +1,91 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Group, Post, SearchPosting
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    backend = search.FTS5
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='Амалия')
+        self.group = Group.objects.create(
+            title='Кофейня', slug='coffee', description='Всё про капучино')
+        self.often = Post.objects.create(
+            text='Капучино, капучино и ещё раз капучино', author=self.author)
+        self.once = Post.objects.create(
+            text='Капучино с корицей, много корицы и сиропа и сахара',
+            author=self.author)
+        self.other = Post.objects.create(text='Круассан', author=self.author)
+
+    def search(self, query, **params):
+        return Client().get(
+            reverse('posts:search'), {'q': query, **params})
+
+    def test_backend(self):
+        self.assertEqual(search.backend(), self.backend)
+
+    def test_results_are_ranked_and_filtered(self):
+        response = self.search('КАПУЧИНО')
+        self.assertEqual(
+            list(response.context['page']), [self.often, self.once])
+        self.assertEqual(list(response.context['groups']), [self.group])
+
+    def test_every_word_must_match(self):
+        response = self.search('капучино корицей')
+        self.assertEqual(list(response.context['page']), [self.once])
+        self.assertFalse(self.search('"капучино OR').context['page'])
+        self.assertFalse(self.search('  ').context['page'])
+
+    def test_index_follows_edit_and_delete(self):
+        self.other.text = 'Круассан и капучино'
+        self.other.save()
+        self.often.delete()
+        self.group.description = 'Всё про эспрессо'
+        self.group.save()
+        response = self.search('капучино')
+        self.assertEqual(
+            list(response.context['page']), [self.other, self.once])
+        self.assertFalse(response.context['groups'])
+        self.assertEqual(search.search_ids(search.GROUP, 'эспрессо'),
+                         [self.group.pk])
+
+    def test_pagination_keeps_query(self):
+        Post.objects.bulk_create(
+            Post(text=f'капучино {i}', author=self.author) for i in range(11))
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        response = self.search('капучино', page=2)
+        self.assertEqual(len(response.context['page']), 3)
+        self.assertContains(response, '?q=%D0%BA%D0%B0%D0%BF')
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'корицей'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.once])
+        with self.settings(SEARCH_MAX_RESULTS=1):
+            response = client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'капучино'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.often])
+
+
+@override_settings(SEARCH_BACKEND=search.PYTHON)
+class PythonSearchTests(SearchTests):
+    backend = search.PYTHON
+
+    def test_postings_are_stored(self):
+        self.assertEqual(SearchPosting.objects.get(
+            kind=search.POST, object_id=self.often.pk,
+            term='капучино').frequency, 3)
@@ -0,0 +1,41 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from yatube.sqlite import apply_pragmas
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def pragmas(self, profile):
+        raw = sqlite3.connect(
+            os.path.join(self.directory, f'{profile}.sqlite3'))
+        self.addCleanup(raw.close)
+        apply_pragmas(None, SimpleNamespace(
+            vendor='sqlite', connection=raw,
+            settings_dict=settings.DATABASE_PROFILES[profile]))
+        return {
+            name: raw.execute(f'PRAGMA {name}').fetchone()[0]
+            for name in ('journal_mode', 'synchronous', 'busy_timeout',
+                         'cache_size')}
+
+    def test_production_profile_tunes_new_connections(self):
+        self.assertEqual(self.pragmas('production'), {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'busy_timeout': 5000,
+            'cache_size': -64 * 1024,
+        })
+        self.assertEqual(
+            settings.DATABASE_PROFILES['production']['CONN_MAX_AGE'], 600)
+
+    def test_development_profile_keeps_defaults(self):
+        self.assertEqual(self.pragmas('development')['journal_mode'], 'delete')
@@ -0,0 +1,98 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+import brotli
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import Client, SimpleTestCase, override_settings
+
+CSS = 'body { color: #333; }\n' * 200
+SCRIPT = 'console.log("yatube");\n' * 2000
+
+
+class StaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        for directory in (source, self.root):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        os.makedirs(os.path.join(source, 'css'))
+        files = {'css/site.css': CSS, 'site.js': SCRIPT, 'robots.txt': 'x'}
+        for name, content in files.items():
+            with open(os.path.join(source, name), 'w') as file:
+                file.write(content)
+        overrides = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=self.root,
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATIC_MEMORY_MAX_SIZE=10000)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def collect(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(self.root, 'staticfiles.json')) as file:
+            return json.load(file)['paths']
+
+    def test_collectstatic_writes_compressed_hashed_files(self):
+        hashed = self.collect()['css/site.css']
+        self.assertNotEqual(hashed, 'css/site.css')
+        path = os.path.join(self.root, hashed)
+        with open(path + '.gz', 'rb') as file:
+            self.assertEqual(gzip.decompress(file.read()).decode(), CSS)
+        with open(path + '.br', 'rb') as file:
+            self.assertEqual(brotli.decompress(file.read()).decode(), CSS)
+        robots = os.path.join(self.root, self.collect()['robots.txt'])
+        self.assertFalse(os.path.exists(robots + '.gz'))
+
+    def test_static_links_hashed_name_once_collected(self):
+        self.assertEqual(static('css/site.css'), '/static/css/site.css')
+        hashed = self.collect()['css/site.css']
+        self.assertEqual(static('css/site.css'), f'/static/{hashed}')
+
+    def test_serves_the_accepted_encoding(self):
+        url = '/static/' + self.collect()['css/site.css']
+        client = Client()
+        for accept, encoding in (
+            ('gzip, deflate, br', 'br'),
+            ('gzip', 'gzip'),
+            ('br;q=0, gzip;q=0.5', 'gzip'),
+            ('', None),
+        ):
+            with self.subTest(accept=accept):
+                response = client.get(url, HTTP_ACCEPT_ENCODING=accept)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], 'text/css')
+                self.assertEqual(
+                    response['Cache-Control'],
+                    'public, max-age=31536000, immutable')
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                body = response.content
+                if encoding == 'br':
+                    body = brotli.decompress(body)
+                elif encoding == 'gzip':
+                    body = gzip.decompress(body)
+                self.assertEqual(body.decode(), CSS)
+                self.assertEqual(
+                    int(response['Content-Length']), len(response.content))
+
+    def test_large_files_are_streamed(self):
+        url = '/static/' + self.collect()['site.js']
+        response = Client().get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content).decode(), SCRIPT)
+
+    def test_unhashed_names_are_revalidated(self):
+        self.collect()
+        client = Client()
+        response = client.get('/static/css/site.css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        response = client.get(
+            '/static/css/site.css',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(client.get('/static/missing.css').status_code, 404)
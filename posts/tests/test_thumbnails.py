@@ -0,0 +1,87 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(THUMBNAIL_WORKERS=0, MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        thumbnails.shutdown()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Амалия')
+        self.post = Post.objects.create(
+            text='a', author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'))
+        self.client = Client()
+
+    def test_card_shows_placeholder_until_thumbnail_is_ready(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Изображение обрабатывается')
+        url = thumbnails.generate(self.post.image.name)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Изображение обрабатывается')
+        self.assertContains(response, url)
+
+    def test_thumbnail_is_queued_once(self):
+        with mock.patch('posts.thumbnails.transaction.on_commit') as on_commit:
+            thumbnails.schedule(self.post.image.name)
+            thumbnails.schedule(self.post.image.name)
+        self.assertEqual(on_commit.call_count, 1)
+        on_commit.call_args[0][0]()
+        self.assertIsNotNone(
+            thumbnails.card_thumbnail_url(self.post.image.name))
+
+    @override_settings(THUMBNAIL_WORKERS=1)
+    def test_shutdown_waits_for_queued_thumbnails(self):
+        done = []
+        with mock.patch('posts.thumbnails.generate', done.append):
+            thumbnails._submit(self.post.image.name)
+            thumbnails.shutdown()
+        self.assertEqual(done, [self.post.image.name])
+        self.assertIsNone(thumbnails._executor)
+
+    def test_warm_thumbnails_builds_missing_thumbnails(self):
+        call_command('warm_thumbnails', workers=1, stdout=open(
+            '/dev/null', 'w'))
+        self.assertIsNotNone(
+            thumbnails.card_thumbnail_url(self.post.image.name))
+
+    def test_ready_thumbnails_survive_cache_loss(self):
+        thumbnails.generate(self.post.image.name)
+        image = thumbnails.card_image(self.post.image.name)
+        version = Post.objects.get(pk=self.post.pk).version
+        cache.clear()
+        self.assertEqual(thumbnails.card_image(self.post.image.name), image)
+        cache.clear()
+        call_command('warm_thumbnails', workers=1, stdout=open(
+            '/dev/null', 'w'))
+        self.assertEqual(Post.objects.get(pk=self.post.pk).version, version)
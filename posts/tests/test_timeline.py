@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Follow, Post, TimelineEntry
+from posts.timeline import FollowFeedPaginator, follow_feed
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='Амалия')
+        self.another_reader = User.objects.create_user(username='Русик')
+        self.author = User.objects.create_user(username='Стас')
+        self.old_post = Post.objects.create(text='old', author=self.author)
+
+    def test_follow_adds_existing_posts_and_new_posts_fan_out(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='new', author=self.author)
+        self.assertEqual(
+            set(self.reader.timeline.values_list('post', flat=True)),
+            {self.old_post.pk, new_post.pk})
+        self.assertFalse(self.another_reader.timeline.exists())
+
+    def test_unfollow_removes_author_posts(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.delete()
+        self.assertFalse(self.reader.timeline.exists())
+        self.assertNotIn(self.old_post, follow_feed(self.reader))
+
+    @override_settings(FOLLOW_FEED_FANOUT_THRESHOLD=2)
+    def test_celebrity_posts_are_read_without_fan_out(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.another_reader, author=self.author)
+        new_post = Post.objects.create(text='new', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists())
+        self.assertIn(new_post, follow_feed(self.reader))
+        self.assertIn(new_post, follow_feed(self.another_reader))
+
+    def test_rebuild_timelines_restores_entries(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=open('/dev/null', 'w'))
+        self.assertEqual(
+            list(follow_feed(self.reader)), [self.old_post])
+
+    @override_settings(FOLLOW_FEED_FANOUT_THRESHOLD=2)
+    def test_posts_reach_timelines_when_author_drops_below_threshold(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(
+            user=self.another_reader, author=self.author)
+        new_post = Post.objects.create(text='new', author=self.author)
+        follow.delete()
+        self.assertIn(new_post, follow_feed(self.reader))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=new_post).exists())
+        self.assertNotIn(new_post, follow_feed(self.another_reader))
+
+    @override_settings(FOLLOW_FEED_FANOUT_THRESHOLD=2)
+    def test_paginator_merges_timeline_and_celebrity_posts(self):
+        celebrity = User.objects.create_user(username='Лев')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=celebrity)
+        Follow.objects.create(user=self.another_reader, author=celebrity)
+        for number in range(3):
+            Post.objects.create(text=f'a{number}', author=self.author)
+            Post.objects.create(text=f'c{number}', author=celebrity)
+        feed = list(follow_feed(self.reader).order_by('-pub_date', '-id'))
+        self.assertEqual(len(feed), 7)
+        paginator = FollowFeedPaginator(
+            self.reader, follow_feed(self.reader), 3)
+        pages, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append(list(page))
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(pages, [feed[:3], feed[3:6], feed[6:]])
+        previous = paginator.get_page(page.previous_cursor)
+        self.assertEqual(list(previous), feed[3:6])
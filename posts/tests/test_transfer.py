@@ -0,0 +1,149 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts import search, transfer
+from posts.models import AuthorStats, Comment, Follow, Group, Post
+from posts.timeline import follow_feed
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='Амалия')
+        self.reader = User.objects.create_user(username='Русик')
+        self.group = Group.objects.create(
+            title='Кофе', slug='coffee', description='Всё о кофе')
+        self.posts = [
+            Post.objects.create(
+                text=f'капучино {i}', author=self.author,
+                group=self.group if i % 2 else None)
+            for i in range(5)]
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='вкусно')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.directory = tempfile.mkdtemp()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def export_all(self, format):
+        exported = {}
+        for kind in transfer.KINDS:
+            path = self.path(f'{kind}.{format}')
+            call_command(
+                'export_data', kind, format=format, output=path,
+                stderr=io.StringIO())
+            with open(path, encoding='utf-8') as file:
+                exported[kind] = file.read()
+        return exported
+
+    def import_all(self, format, **options):
+        for kind in transfer.KINDS:
+            call_command(
+                'import_data', kind, self.path(f'{kind}.{format}'),
+                stdout=io.StringIO(), **options)
+
+    def test_round_trip(self):
+        for format in transfer.FORMATS:
+            with self.subTest(format=format):
+                exported = self.export_all(format)
+                User.objects.all().delete()
+                Group.objects.all().delete()
+                self.import_all(format, batch_size=2)
+                self.assertEqual(self.export_all(format), exported)
+
+    def test_import_fixes_derived_data(self):
+        self.export_all(transfer.NDJSON)
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.import_all(transfer.NDJSON, batch_size=2)
+        author = User.objects.get(username='Амалия')
+        reader = User.objects.get(username='Русик')
+        self.assertFalse(author.has_usable_password())
+        stats = AuthorStats.objects.get(user=author)
+        self.assertEqual((stats.post_count, stats.follower_count), (5, 1))
+        self.assertEqual(AuthorStats.objects.get(
+            user=reader).following_count, 1)
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[0].pk).comment_count, 1)
+        self.assertEqual(
+            set(follow_feed(reader).values_list('pk', flat=True)),
+            {post.pk for post in self.posts})
+        self.assertEqual(
+            set(search.search_ids(search.POST, 'капучино')),
+            {post.pk for post in self.posts})
+        self.assertEqual(
+            search.search_ids(search.GROUP, 'кофе'),
+            [Group.objects.get().pk])
+
+    def test_resume_from_checkpoint(self):
+        self.export_all(transfer.NDJSON)
+        Post.objects.all().delete()
+        path = self.path('posts.ndjson')
+        calls = []
+
+        def interrupted(rows, maps):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return transfer._import_posts(rows, maps)
+
+        with mock.patch.dict(transfer.IMPORTERS, posts=interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command(
+                    'import_data', 'posts', path, batch_size=2,
+                    stdout=io.StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertTrue(os.path.exists(path + '.checkpoint'))
+        output = io.StringIO()
+        call_command(
+            'import_data', 'posts', path, batch_size=2, resume=True,
+            stdout=output)
+        self.assertIn('Обработано записей: 5, загружено: 3',
+                      output.getvalue())
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+    def test_checkpoint_of_another_kind(self):
+        self.export_all(transfer.NDJSON)
+        path = self.path('posts.ndjson')
+        with open(path + '.checkpoint', 'w') as file:
+            file.write('{"kind": "comments", "records": 1}')
+        with self.assertRaises(CommandError):
+            call_command('import_data', 'posts', path, resume=True)
+
+    def test_taken_ids_are_skipped(self):
+        self.export_all(transfer.NDJSON)
+        kept = self.posts[1]
+        Post.objects.exclude(pk=kept.pk).delete()
+        Post.objects.filter(pk=kept.pk).update(text='existing')
+        pub_date = Post.objects.get(pk=kept.pk).pub_date
+        output = io.StringIO()
+        call_command(
+            'import_data', 'posts', self.path('posts.ndjson'),
+            batch_size=2, stdout=output)
+        self.assertIn('Обработано записей: 5, загружено: 4',
+                      output.getvalue())
+        kept = Post.objects.get(pk=kept.pk)
+        self.assertEqual((kept.text, kept.pub_date), ('existing', pub_date))
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_follows_fan_out_once(self):
+        self.export_all(transfer.NDJSON)
+        Follow.objects.all().delete()
+        with mock.patch('posts.timeline.rebuild') as rebuild:
+            call_command(
+                'import_data', 'follows', self.path('follows.ndjson'),
+                stdout=io.StringIO())
+        rebuild.assert_not_called()
+        self.assertEqual(
+            set(follow_feed(self.reader).values_list('pk', flat=True)),
+            {post.pk for post in self.posts})
@@ -1,23 +1,31 @@
+import hashlib
 import shutil
 import tempfile
 
 from django import forms
-from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Follow, Group, Post
+from posts import thumbnails
+from posts.models import Comment, Follow, Group, Post
+from posts.storage import content_name
+
+from .utils import assert_max_queries
 
 User = get_user_model()
 
+MEDIA_ROOT = tempfile.mkdtemp()
+
 
+@override_settings(THUMBNAIL_WORKERS=0, MEDIA_ROOT=MEDIA_ROOT)
 class PostsViewsTests(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
         cls.group = Group.objects.create(
             title='Группа',
             slug='group'
@@ -56,7 +64,8 @@ class PostsViewsTests(TestCase):
 
     @classmethod
     def tearDownClass(cls):
-        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        thumbnails.shutdown()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
         super().tearDownClass()
 
     def setUp(self):
@@ -70,7 +79,8 @@ class PostsViewsTests(TestCase):
         self.assertEqual(post.text, PostsViewsTests.text)
         self.assertEqual(post.group, PostsViewsTests.group)
         self.assertEqual(post.author, PostsViewsTests.user)
-        self.assertEqual(post.image, 'posts/small.gif')
+        self.assertEqual(post.image, content_name(
+            'posts/small.gif', hashlib.sha256(self.small_gif).hexdigest()))
 
     def test_pages_use_correct_template(self):
         templates_pages_names = {
@@ -247,3 +257,133 @@ class PaginatorTestViews(TestCase):
         response = self.client.get(
             reverse('posts:index'), {'page': '2'})
         self.assertEqual(len(response.context.get('page').object_list), 3)
+
+    def test_cursor_pages_walk_the_whole_feed(self):
+        response = self.guest_client.get(reverse('posts:index'))
+        first_page = response.context.get('page')
+        self.assertIsNone(first_page.previous_cursor)
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': first_page.next_cursor})
+        second_page = response.context.get('page')
+        self.assertEqual(len(second_page.object_list), 3)
+        self.assertIsNone(second_page.next_cursor)
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': second_page.previous_cursor})
+        self.assertEqual(
+            list(response.context.get('page').object_list),
+            list(first_page.object_list))
+
+    def test_cursor_page_does_not_count_posts(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('posts:index'))
+        self.assertFalse(
+            any(query['sql'].startswith('SELECT COUNT(*)')
+                for query in queries))
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': 'broken'})
+        self.assertEqual(len(response.context.get('page').object_list), 10)
+
+
+class FeedQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Русик')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for i in range(12):
+            author = User.objects.create_user(username=f'author{i}')
+            Follow.objects.create(user=cls.reader, author=author)
+            post = Post.objects.create(
+                text=str(i), author=author, group=cls.group)
+            for j in range(3):
+                Comment.objects.create(
+                    post=post, author=cls.reader, text=str(j))
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FeedQueryBudgetTests.reader)
+
+    def test_feeds_stay_within_query_budget(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author0'}),
+            reverse('posts:follow_index'),
+            reverse(
+                'posts:post',
+                kwargs={
+                    'username': 'author0',
+                    'post_id': Post.objects.get(text='0').pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with assert_max_queries(self):
+                    response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_count_is_annotated(self):
+        response = self.authorized_client.get(reverse('posts:index'))
+        for post in response.context['page']:
+            with self.subTest(post=post):
+                self.assertEqual(post.comment_count, 3)
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Амалия')
+        cls.post = Post.objects.create(text='пост', author=cls.author)
+        readers = [
+            User.objects.create_user(username=f'reader{i}')
+            for i in range(5)]
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=readers[i % 5], text=f'c{i}')
+            for i in range(45)]
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_post_page_shows_first_comments_only(self):
+        url = reverse(
+            'posts:post',
+            kwargs={'username': 'Амалия', 'post_id': self.post.pk})
+        with assert_max_queries(self):
+            response = self.client.get(url)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [f'c{i}' for i in range(44, 24, -1)])
+        self.assertContains(
+            response, reverse('posts:comments', kwargs={
+                'username': 'Амалия', 'post_id': self.post.pk}))
+
+    def test_fragments_load_the_rest(self):
+        response = self.client.get(reverse(
+            'posts:post',
+            kwargs={'username': 'Амалия', 'post_id': self.post.pk}))
+        texts = [comment.text for comment in response.context['comments']]
+        cursor = response.context['comments_cursor']
+        url = reverse('posts:comments', kwargs={
+            'username': 'Амалия', 'post_id': self.post.pk})
+        while cursor:
+            with assert_max_queries(self, 4):
+                response = self.client.get(url, {'cursor': cursor})
+            self.assertTemplateUsed(response, 'include/comment_list.html')
+            texts += [comment.text for comment in response.context['comments']]
+            cursor = response.context['comments_cursor']
+        self.assertEqual(texts, [f'c{i}' for i in range(44, -1, -1)])
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_short_thread_has_no_more_link(self):
+        post = Post.objects.create(text='другой', author=self.author)
+        Comment.objects.create(post=post, author=self.author, text='c')
+        response = self.client.get(reverse(
+            'posts:post',
+            kwargs={'username': 'Амалия', 'post_id': post.pk}))
+        self.assertIsNone(response.context['comments_cursor'])
+        self.assertNotContains(response, reverse('posts:comments', kwargs={
+            'username': 'Амалия', 'post_id': post.pk}))
@@ -0,0 +1,18 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+FEED_QUERY_BUDGET = 8
+
+
+@contextmanager
+def assert_max_queries(testcase, budget=FEED_QUERY_BUDGET):
+    with CaptureQueriesContext(connection) as context:
+        yield context
+    executed = len(context.captured_queries)
+    testcase.assertLessEqual(
+        executed, budget,
+        '{} queries executed, budget is {}:\n{}'.format(
+            executed, budget,
+            '\n'.join(query['sql'] for query in context.captured_queries)))
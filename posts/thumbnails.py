@@ -0,0 +1,135 @@
+"""Card thumbnails generated off the request path.
+
+Saving a post with an image queues its 960x339 card variants (see
+``posts.images``) on a thread pool; until they are ready the card shows
+a placeholder. When they are done, every post with that image gets a new
+version, so its cached card is rendered again with the real image.
+
+Whether the variants are ready is read from the storage, which every
+worker shares, and kept in the cache only to save the ``exists()``
+calls; an evicted entry is looked up again, not rebuilt.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from .freshness import touch_posts
+from .images import (
+    card_variants, move_variants, stored_variants, variant_names)
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _key(name):
+    return f'card_image:{name}'
+
+
+def _pending_key(name):
+    return f'thumbnail_pending:{name}'
+
+
+def card_image(name):
+    """The ready card variants of ``name``, or ``None``."""
+    if not name:
+        return None
+    image = cache.get(_key(name))
+    if image is None:
+        image = stored_variants(name)
+        if image is not None:
+            cache.set(_key(name), image, None)
+    return image
+
+
+def card_thumbnail_url(name):
+    """URL of the ready card thumbnail of ``name``, or ``None``."""
+    image = card_image(name)
+    return image['src'] if image else None
+
+
+def forget(name):
+    """Delete the card variants of ``name`` and their cache entry."""
+    image = card_image(name)
+    files = set(variant_names(name)) | set(image['files'] if image else ())
+    for file in files:
+        if default_storage.exists(file):
+            default_storage.delete(file)
+    cache.delete(_key(name))
+
+
+def rename(old, new):
+    """Let the image now called ``new`` keep the variants of ``old``."""
+    if card_image(new) is not None:
+        forget(old)
+        return
+    move_variants(old, new)
+    cache.delete_many([_key(old), _key(new)])
+
+
+def generate(name):
+    """Build the card variants of ``name``; return the fallback URL."""
+    try:
+        image = card_variants(name)
+        cache.set(_key(name), image, None)
+        posts = Post.objects.filter(image=name)
+        posts.update(version=F('version') + 1)
+        touch_posts(posts)
+        return image['src']
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+        return None
+    finally:
+        cache.delete(_pending_key(name))
+
+
+def _run(name):
+    try:
+        generate(name)
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails')
+        return _executor
+
+
+def shutdown():
+    """Wait for the queued thumbnails and stop the pool.
+
+    The next ``schedule()`` starts a new pool.
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def _submit(name):
+    if not settings.THUMBNAIL_WORKERS:
+        generate(name)
+    else:
+        _get_executor().submit(_run, name)
+
+
+def schedule(name):
+    """Queue ``name`` once the current transaction commits."""
+    if not name or not cache.add(
+            _pending_key(name), 1, settings.THUMBNAIL_PENDING_TIMEOUT):
+        return
+    transaction.on_commit(lambda: _submit(name))
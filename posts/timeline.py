@@ -0,0 +1,176 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginator import POSTS_PER_PAGE, CursorPaginator, after, before
+
+BATCH_SIZE = 1000
+
+
+def _bulk_insert(entries, ignore_conflicts=True):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(
+            batch, ignore_conflicts=ignore_conflicts)
+
+
+def _follower_count(author_id):
+    return AuthorStats.objects.filter(user_id=author_id).values_list(
+        'follower_count', flat=True).first() or 0
+
+
+def is_celebrity(author_id):
+    return _follower_count(author_id) >= (
+        settings.FOLLOW_FEED_FANOUT_THRESHOLD)
+
+
+def celebrities(users=None):
+    """Authors at or above the threshold, of ``users`` if given."""
+    stats = AuthorStats.objects.filter(
+        follower_count__gte=settings.FOLLOW_FEED_FANOUT_THRESHOLD)
+    if users is not None:
+        stats = stats.filter(user__in=users)
+    return stats.values('user_id')
+
+
+def celebrities_followed_by(user):
+    return celebrities(
+        Follow.objects.filter(user=user).values('author_id'))
+
+
+def fan_out(post):
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator())
+
+
+def fan_out_many(posts):
+    """``fan_out`` for a batch of posts saved without signals."""
+    entries = Follow.objects.filter(
+        author__posts__in=posts.values('pk')
+    ).exclude(
+        author__in=celebrities(posts.values('author_id'))
+    ).values_list('user_id', 'author__posts', 'author__posts__pub_date')
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id, post_id, pub_date in entries.iterator())
+
+
+def add_author(user, author):
+    if is_celebrity(author.pk):
+        return
+    posts = Post.objects.filter(author=author).values_list('pk', 'pub_date')
+    _bulk_insert(
+        TimelineEntry(user=user, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator())
+
+
+def add_follows(pairs):
+    """``add_author`` for many ``(user_id, author_id)`` pairs at once."""
+    famous = set(celebrities(
+        [author_id for _, author_id in pairs]).values_list(
+            'user_id', flat=True))
+    followers = {}
+    for user_id, author_id in pairs:
+        if author_id not in famous:
+            followers.setdefault(author_id, []).append(user_id)
+    posts = Post.objects.filter(author__in=list(followers)).values_list(
+        'pk', 'author_id', 'pub_date')
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, author_id, pub_date in posts.iterator()
+        for user_id in followers[author_id])
+
+
+def remove_author(user, author):
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+    if _follower_count(author) == settings.FOLLOW_FEED_FANOUT_THRESHOLD - 1:
+        # The author has just stopped being read on the celebrity path:
+        # the posts written since are in nobody's timeline yet.
+        _backfill(author)
+
+
+def _backfill(author_id):
+    entries = Follow.objects.filter(
+        author_id=author_id, author__posts__isnull=False
+    ).values_list('user_id', 'author__posts', 'author__posts__pub_date')
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id, post_id, pub_date in entries.iterator())
+
+
+def follow_feed(user):
+    """Posts of the authors ``user`` follows.
+
+    Regular authors are read from the materialized timeline; authors at or
+    above ``FOLLOW_FEED_FANOUT_THRESHOLD`` followers, by their
+    ``AuthorStats.follower_count``, are merged in on read. Page it with
+    ``FollowFeedPaginator``, which does not scan the whole feed.
+    """
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post_id'))
+        | Q(author__in=celebrities_followed_by(user))
+    )
+
+
+class FollowFeedPaginator(CursorPaginator):
+    """``CursorPaginator`` over ``follow_feed(user)``.
+
+    The posts of a page are picked by two keyset queries of at most a page
+    each: one over the user's timeline, on its ``(user, pub_date, post)``
+    index, and one over the posts of the celebrities they follow. Only the
+    picked posts are then read through ``queryset``.
+    """
+
+    def __init__(self, user, queryset, per_page=POSTS_PER_PAGE):
+        super().__init__(queryset, per_page)
+        self.user = user
+
+    def _after(self, position):
+        return self._window(after, position, newest_first=True)
+
+    def _before(self, position):
+        return self._window(before, position, newest_first=False)
+
+    def _window(self, keyset, position, newest_first):
+        limit = self.per_page + 1
+        entries = keyset(
+            TimelineEntry.objects.filter(user=self.user), position,
+            key='post_id')
+        posts = keyset(
+            Post.objects.filter(
+                author__in=celebrities_followed_by(self.user)),
+            position)
+        # A post can be on both paths while its author crosses the
+        # threshold; the set drops the copy.
+        keys = sorted(
+            set(entries.values_list('pub_date', 'post_id')[:limit])
+            | set(posts.values_list('pub_date', 'pk')[:limit]),
+            reverse=newest_first)[:limit]
+        return keyset(
+            self.queryset.filter(pk__in=[pk for _, pk in keys]), position)
+
+
+def rebuild(user):
+    celebrities = celebrities_followed_by(user)
+    posts = Post.objects.filter(
+        author__following__user=user
+    ).exclude(
+        author__in=celebrities
+    ).values_list('pk', 'pub_date')
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user=user).delete()
+        _bulk_insert(
+            (TimelineEntry(user=user, post_id=post_id, pub_date=pub_date)
+             for post_id, pub_date in posts.iterator()),
+            ignore_conflicts=False)
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -9,6 +9,22 @@ urlpatterns = [
     path('group/<str:slug>/', views.group_posts, name='group'),
     path('new/', views.NewPostView.as_view(), name='new_post'),
     path('follow/', views.follow_index, name="follow_index"),
+    path('search/', views.search, name='search'),
+    path('archive/', views.archive, name='archive'),
+    path('api/v1/posts/', api.index, name='api_index'),
+    path(
+        'api/v1/groups/<str:slug>/posts/',
+        api.group_posts, name='api_group'
+    ),
+    path('api/v1/follow/posts/', api.follow_index, name='api_follow_index'),
+    path(
+        'api/v1/users/<str:username>/posts/',
+        api.profile, name='api_profile'
+    ),
+    path(
+        'api/v1/users/<str:username>/posts/<int:post_id>/',
+        api.post_view, name='api_post'
+    ),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path(
@@ -16,6 +32,10 @@ urlpatterns = [
         views.post_edit,
         name='post_edit'
     ),
+    path(
+        '<str:username>/<int:post_id>/comments/',
+        views.post_comments, name='comments'
+    ),
     path(
         '<username>/<int:post_id>/comment/',
         views.add_comment, name='add_comment'
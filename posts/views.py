@@ -1,35 +1,70 @@
+from functools import partial
+from urllib.parse import quote
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
+from django.utils.http import urlencode
 from django.views.generic import CreateView
+from yatube.jinja2 import view_engine
+from yatube.replicas import replica_reads
 
+from . import comment_buffer
+from .archive import archive as build_archive
+from .counters import author_stats
 from .forms import CommentForm, PostForm
+from .freshness import (conditional, follow_validators, group_validators,
+                        index_validators, post_validators, profile_validators)
 from .models import Follow, Group, Post
+from .paginator import (COMMENTS_PER_PAGE, NEXT, POSTS_PER_PAGE,
+                        CursorPaginator, encode_cursor, get_page)
+from .search import GROUP, POST, ranked, search_ids
+from .thumbnails import schedule as schedule_thumbnail
+from .timeline import FollowFeedPaginator, follow_feed
 
 User = get_user_model()
 
+SEARCH_GROUPS_SHOWN = 5
+
 
+@replica_reads
+@conditional(index_validators)
 def index(request):
-    paginator = Paginator(Post.objects.all(), 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    index_page = f'index_{page_number}'
+    page = get_page(request, Post.objects.for_cards())
     return render(
-        request,
-        'index.html',
-        {'page': page, 'index_page': index_page}
-    )
+        request, 'index.html', {'page': page}, using=view_engine(request))
 
 
+@replica_reads
+@conditional(group_validators)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    paginator = Paginator(group.posts.all(), 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'group.html', {'group': group, 'page': page})
+    page = get_page(request, group.posts.for_cards())
+    return render(
+        request, 'group.html', {'group': group, 'page': page},
+        using=view_engine(request))
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(
+        search_ids(POST, query, settings.SEARCH_MAX_RESULTS), POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    page.object_list = ranked(Post.objects.for_cards(), page.object_list)
+    groups = ranked(
+        Group.objects.all(), search_ids(GROUP, query, SEARCH_GROUPS_SHOWN))
+    context = {
+        'query': query,
+        'groups': groups,
+        'page': page,
+        'page_query': urlencode({'q': query}) + '&'
+    }
+    return render(request, 'search.html', context)
 
 
 class NewPostView(LoginRequiredMixin, CreateView):
@@ -41,42 +76,72 @@ class NewPostView(LoginRequiredMixin, CreateView):
         new_post = form.save(commit=False)
         new_post.author = self.request.user
         new_post.save()
+        if new_post.image:
+            schedule_thumbnail(new_post.image.name)
         return super().form_valid(form)
 
 
+@replica_reads
+@conditional(profile_validators)
 def profile(request, username):
     following = request.user.is_authenticated and (
         request.user.follower.filter(author__username=username).exists())
     author = get_object_or_404(User, username=username)
-    paginator = Paginator(author.posts.all(), 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    num_posts = author.posts.count()
+    page = get_page(request, author.posts.for_cards())
+    stats = author_stats(author)
     context = {
-        'num_posts': num_posts,
+        'num_posts': stats.post_count,
+        'stats': stats,
         'page': page,
         'author': author,
         'following': following
     }
-    return render(request, 'profile.html', context)
+    return render(
+        request, 'profile.html', context, using=view_engine(request))
 
 
+@replica_reads
+@conditional(post_validators)
 def post_view(request, username, post_id):
     if request.method == 'POST':
         return add_comment(request, username, post_id)
     author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, pk=post_id, author__username=username)
-    num_posts = author.posts.count()
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.for_cards(), pk=post_id, author__username=username)
+    stats = author_stats(author)
+    comments = post.comments.select_related('author').order_by(
+        '-created', '-id')[:COMMENTS_PER_PAGE]
+    # The denormalized count tells whether older comments remain.
+    comments_cursor = None
+    if post.comment_count > COMMENTS_PER_PAGE and comments:
+        comments_cursor = encode_cursor(list(comments)[-1], NEXT, 'created')
     form = CommentForm()
     context = {
         'form': form,
         'comments': comments,
+        'comments_cursor': comments_cursor,
+        'pending_comments': comment_buffer.pending(request, post.pk),
         'author': author,
         'post': post,
-        'num_posts': num_posts
+        'num_posts': stats.post_count,
+        'stats': stats
     }
-    return render(request, 'post.html', context)
+    return render(request, 'post.html', context, using=view_engine(request))
+
+
+@conditional(post_validators)
+def post_comments(request, username, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related('author'),
+        pk=post_id, author__username=username)
+    page = CursorPaginator(
+        post.comments.select_related('author'), COMMENTS_PER_PAGE, 'created'
+    ).get_page(request.GET.get('cursor'))
+    return render(request, 'include/comment_list.html', {
+        'post': post,
+        'comments': page,
+        'comments_cursor': page.next_cursor,
+    }, using=view_engine(request))
 
 
 @login_required
@@ -97,7 +162,9 @@ def post_edit(request, username, post_id):
         files=request.FILES or None,
         instance=post)
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data and post.image:
+            schedule_thumbnail(post.image.name)
         return redirect(
             reverse_lazy(
                 'posts:post',
@@ -132,7 +199,7 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        comment_buffer.submit(request, comment)
     return redirect(
         reverse_lazy(
             'posts:post',
@@ -141,18 +208,29 @@ def add_comment(request, username, post_id):
     )
 
 
+@replica_reads
 @login_required
+@conditional(follow_validators)
 def follow_index(request):
-    posts = Post.objects.filter(
-        author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = get_page(
+        request, follow_feed(request.user).for_cards(),
+        paginator_class=partial(FollowFeedPaginator, request.user))
     return render(
         request, 'follow.html',
         {
             'page': page,
-            'paginator': paginator})
+            'paginator': page.paginator},
+        using=view_engine(request))
+
+
+@login_required
+def archive(request):
+    response = StreamingHttpResponse(
+        build_archive(request.user), content_type='application/zip')
+    response['Content-Disposition'] = (
+        "attachment; filename=\"yatube.zip\"; filename*=UTF-8''"
+        + quote(f'yatube-{request.user.username}.zip'))
+    return response
 
 
 @login_required
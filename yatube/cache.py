@@ -0,0 +1,161 @@
+"""SQLite cache backend shared by all worker processes on one host.
+
+Entries live in a standalone SQLite file in WAL mode, so readers never
+block each other and every worker sees the same data without running a
+separate cache server.
+"""
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    # Expired rows are purged and MAX_ENTRIES enforced once per this many
+    # writes, so an ordinary set() does not pay for a COUNT(*).
+    cull_every = 100
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.location, timeout=5, isolation_level=None,
+                check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'expires REAL NOT NULL)')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+            self._local.connection = connection
+        return connection
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return float('inf') if expires is None else expires
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        row = self._connection.execute(
+            'SELECT value FROM cache WHERE key = ? AND expires > ?',
+            (self._key(key, version), time.time())).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        rows = self._connection.execute(
+            'SELECT key, value FROM cache WHERE key IN ({}) '
+            'AND expires > ?'.format(', '.join('?' * len(keys))),
+            (*keys, time.time()))
+        return {keys[key]: pickle.loads(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)', key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with _immediate(self._connection) as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time()))
+            return connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (key, pickle.dumps(value, self.pickle_protocol),
+                 self._expires(timeout))).rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        with _immediate(self._connection) as connection:
+            return connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? AND expires > ?',
+                (self._expires(timeout), self._key(key, version),
+                 time.time())).rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with _immediate(self._connection) as connection:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND expires > ?',
+                (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, self.pickle_protocol), key))
+        return value
+
+    def delete(self, key, version=None):
+        with _immediate(self._connection) as connection:
+            return connection.execute(
+                'DELETE FROM cache WHERE key = ?',
+                (self._key(key, version),)).rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND expires > ?',
+            (self._key(key, version), time.time())).fetchone() is not None
+
+    def clear(self):
+        with _immediate(self._connection) as connection:
+            connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Connections are reused across requests on purpose.
+        pass
+
+    def _write(self, sql, key, value, timeout, version):
+        key = self._key(key, version)
+        with _immediate(self._connection) as connection:
+            connection.execute(sql, (
+                key, pickle.dumps(value, self.pickle_protocol),
+                self._expires(timeout)))
+            self._writes += 1
+            if self._writes % self.cull_every == 0:
+                self._cull(connection)
+
+    def _cull(self, connection):
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries and self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+        elif count > self._max_entries:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY expires LIMIT ?)',
+                (count // self._cull_frequency,))
+
+
+class _immediate:
+    """``BEGIN IMMEDIATE`` transaction that takes the write lock up front."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
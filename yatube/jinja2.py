@@ -0,0 +1,65 @@
+"""Jinja2 environment of the ``jinja2`` template engine.
+
+The templates in ``jinja2/`` port ``base.html``, the feed pages, the post
+page and the ``include/`` partials they use. ``VIEW_TEMPLATE_ENGINES``
+chooses the engine of each view; views not listed there keep rendering
+the Django templates. The helpers below stand in for the ``{% url %}``,
+``{% static %}``, ``post_cards`` and ``user_filters`` tags and for the
+way Django prints dates.
+"""
+from django.conf import settings
+from django.template.defaultfilters import linebreaksbr
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import formats
+from django.utils.safestring import mark_safe
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+
+from posts.cards import render_card, render_cards
+from posts.templatetags.post_cards import card_thumbnail
+from users.templatetags.user_filters import addclass
+
+ENGINE = 'jinja2'
+
+
+def view_engine(request):
+    """Alias of the template engine of the view serving ``request``."""
+    match = request.resolver_match
+    if match is None:
+        return None
+    return settings.VIEW_TEMPLATE_ENGINES.get(match.view_name)
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args, kwargs=kwargs)
+
+
+def localize(value):
+    """Format ``value`` as ``{{ value }}`` does in a Django template."""
+    return formats.localize(template_localtime(value))
+
+
+def post_card(post, user):
+    return mark_safe(render_card(post, user, ENGINE))
+
+
+def post_cards(posts, user):
+    return [mark_safe(card) for card in render_cards(posts, user, ENGINE)]
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'url': url,
+        'static': static,
+        'card_thumbnail': card_thumbnail,
+        'post_card': post_card,
+        'post_cards': post_cards,
+    })
+    env.filters.update({
+        'addclass': addclass,
+        'linebreaksbr': linebreaksbr,
+        'localize': localize,
+    })
+    return env
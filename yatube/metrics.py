@@ -0,0 +1,180 @@
+"""Per-request metrics: queries, template rendering, cache and wall time.
+
+``RequestMetricsMiddleware`` measures ``REQUEST_METRICS_SAMPLE_RATE`` of
+the requests in full, reports them in the ``Server-Timing`` header and
+logs them to ``yatube.requests``. Any request slower than
+``REQUEST_METRICS_SLOW_MS`` is logged as a warning, sampled or not.
+Template time comes from the ``DjangoTemplates`` and ``Jinja2`` backends
+below, cache hits and misses from ``posts.caching``. While the comment
+buffer is enabled, sampled entries also carry its queue depth and flush
+counters for the worker process, ``posts.comment_buffer.stats()``.
+"""
+import json
+import logging
+import os
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends import django as django_backend
+from django.template.backends import jinja2 as jinja2_backend
+
+logger = logging.getLogger('yatube.requests')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - started
+
+
+class TimedTemplate:
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        # Nested renders, like cached post cards, are part of the outer one.
+        if metrics is None or metrics.rendering:
+            return super().render(context, request)
+        metrics.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+            metrics.rendering = False
+
+
+class Template(TimedTemplate, django_backend.Template):
+    pass
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The stock backend, timing renders of the measured requests."""
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
+
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code).template, self)
+
+
+class Jinja2Template(TimedTemplate, jinja2_backend.Template):
+    pass
+
+
+class Jinja2(jinja2_backend.Jinja2):
+    """The stock Jinja2 backend, timed like ``DjangoTemplates``."""
+
+    def get_template(self, template_name):
+        return Jinja2Template(
+            super().get_template(template_name).template, self)
+
+    def from_string(self, template_code):
+        return Jinja2Template(
+            super().from_string(template_code).template, self)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def server_timing(entry):
+    cache = entry['cache']
+    return ', '.join([
+        f'db;dur={entry["query_ms"]};desc="{entry["queries"]} queries"',
+        f'tpl;dur={entry["template_ms"]}',
+        f'cache;desc="{cache.get("hit", 0)} hits, '
+        f'{cache.get("miss", 0) + cache.get("early", 0)} misses"',
+        f'total;dur={entry["total_ms"]}',
+    ])
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.REQUEST_METRICS_SAMPLE_RATE:
+            started = time.perf_counter()
+            response = self.get_response(request)
+            self._log(request, response, {
+                'total_ms': _ms(time.perf_counter() - started)})
+            return response
+        from posts.caching import collect_events
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.execute))
+                cache = stack.enter_context(collect_events())
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        entry = {
+            'total_ms': _ms(time.perf_counter() - started),
+            'queries': metrics.queries,
+            'query_ms': _ms(metrics.query_time),
+            'template_ms': _ms(metrics.template_time),
+            'cache': dict(cache),
+        }
+        if settings.COMMENT_BUFFER_ENABLED:
+            from posts import comment_buffer
+
+            entry['comment_buffer'] = comment_buffer.stats()
+        response['Server-Timing'] = server_timing(entry)
+        self._log(request, response, entry, sampled=True)
+        return response
+
+    def _log(self, request, response, entry, sampled=False):
+        slow = entry['total_ms'] >= settings.REQUEST_METRICS_SLOW_MS
+        if not (sampled or slow):
+            return
+        match = request.resolver_match
+        logger.log(
+            logging.WARNING if slow else logging.INFO, 'request',
+            extra={'metrics': {
+                'method': request.method,
+                'path': request.path,
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+                'sampled': sampled,
+                **entry,
+            }})
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with the metrics of the record."""
+
+    def format(self, record):
+        return json.dumps({
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            **getattr(record, 'metrics', {'message': record.getMessage()}),
+        }, ensure_ascii=False)
+
+
+class LogFileHandler(RotatingFileHandler):
+    """Rotating log file whose directory is created when needed."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
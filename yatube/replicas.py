@@ -0,0 +1,107 @@
+"""Read replicas for the feed views.
+
+``ReplicaRouter`` sends the reads of views decorated with
+``replica_reads`` to one of ``DATABASE_REPLICAS``; everything else,
+writes included, goes to ``default``. A request that writes is pinned to
+the primary for the rest of it, and ``ReplicaMiddleware`` keeps the
+client pinned for ``REPLICA_STICKY_SECONDS`` afterwards with a cookie, so
+users read their own writes while the replicas catch up.
+
+Locally the replicas are SQLite files refreshed from the primary by
+``replicate``, e.g. ``manage.py replicate --interval 1``, which stands in
+for real replication and its lag.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+COOKIE_NAME = 'primary_until'
+
+_state = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.replica_reads = False
+        self.pinned = pinned
+        self.wrote = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (state is None or not state.replica_reads or state.pinned
+                or not settings.DATABASE_REPLICAS):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def replica_reads(view):
+    """Serve the GET reads of ``view`` from a replica, unless pinned.
+
+    Other methods write, and what they read first must be as fresh as
+    what they write, so they stay on the primary.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None or request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        previous, state.replica_reads = state.replica_reads, True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.replica_reads = previous
+    return wrapper
+
+
+class ReplicaMiddleware:
+    """Pin the clients that wrote recently to the primary."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned = float(request.COOKIES.get(COOKIE_NAME, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        state = RoutingState(pinned=pinned)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            sticky = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                COOKIE_NAME, str(time.time() + sticky), max_age=sticky,
+                httponly=True, samesite='Lax')
+        return response
+
+
+def replicate(aliases=None):
+    """Copy the primary onto every replica with SQLite's backup API."""
+    source = connections[DEFAULT_DB_ALIAS]
+    source.ensure_connection()
+    for alias in aliases or settings.DATABASE_REPLICAS:
+        target = connections[alias]
+        target.ensure_connection()
+        source.connection.backup(target.connection)
@@ -38,7 +38,7 @@ ALLOWED_HOSTS = [
 INSTALLED_APPS = [
     'about',
     'users',
-    'posts',
+    'posts.apps.PostsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -49,6 +49,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.staticfiles.StaticFilesMiddleware',
+    'yatube.metrics.RequestMetricsMiddleware',
+    'yatube.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,7 +66,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,20 +78,74 @@ TEMPLATES = [
             ],
         },
     },
+    {
+        'BACKEND': 'yatube.metrics.Jinja2',
+        'NAME': 'jinja2',
+        'DIRS': [os.path.join(BASE_DIR, 'jinja2')],
+        'OPTIONS': {
+            'environment': 'yatube.jinja2.environment',
+            'context_processors': [
+                'django.contrib.auth.context_processors.auth',
+            ],
+        },
+    },
 ]
 
+# Template engine of each view, by view name; the others use the Django
+# templates. YATUBE_JINJA2_VIEWS lists the views moved onto the Jinja2
+# ports, e.g. 'posts:index,posts:post'.
+VIEW_TEMPLATE_ENGINES = {
+    view: 'jinja2'
+    for view in os.environ.get('YATUBE_JINJA2_VIEWS', '').split(',') if view
+}
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# YATUBE_DB_PROFILE selects the database settings. 'development' opens a
+# connection per request with SQLite's defaults. 'production' keeps
+# connections open between requests and applies PRAGMAS to each new one
+# (yatube/sqlite.py): WAL lets readers run alongside the single writer,
+# synchronous=NORMAL is durable in WAL mode short of a power loss, and
+# writers wait on a busy database instead of failing at once.
+DATABASE_PROFILES = {
+    'development': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    },
+    'production': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': 600,
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            # 256 MiB of the file mapped, 64 MiB of page cache (KiB if < 0).
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+DATABASES = {
+    'default': DATABASE_PROFILES[
+        os.environ.get('YATUBE_DB_PROFILE', 'development')],
 }
+# With YATUBE_DB_REPLICAS=1 the feed views read from the 'replica' alias
+# (yatube/replicas.py); locally it is a copy of the primary refreshed by
+# `manage.py replicate`. Clients that wrote read from the primary for
+# REPLICA_STICKY_SECONDS.
+DATABASES['replica'] = dict(
+    DATABASES['default'],
+    NAME=os.path.join(BASE_DIR, 'db.replica.sqlite3'))
+DATABASE_REPLICAS = (
+    ['replica'] if os.environ.get('YATUBE_DB_REPLICAS') == '1' else [])
+DATABASE_ROUTERS = ['yatube.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 10
 
 
 # Password validation
@@ -129,6 +186,14 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# collectstatic writes content-hashed names with .gz and .br siblings,
+# which StaticFilesMiddleware serves; see yatube/staticfiles.py.
+STATICFILES_STORAGE = 'yatube.staticfiles.CompressedManifestStaticFilesStorage'
+# Static files up to this size are kept in memory once served, larger ones
+# are streamed from disk.
+STATIC_MEMORY_MAX_SIZE = 512 * 1024
+# Cache lifetime of static files requested by their unhashed names.
+STATIC_MAX_AGE = 60
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -139,8 +204,112 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-CACHES = {
-    'default': {
+# YATUBE_CACHE selects the cache: 'locmem' keeps a copy per process,
+# 'file' and 'sqlite' are shared by every worker on the host.
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'sqlite': {
+        'BACKEND': 'yatube.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')],
+}
+
+# How often each worker adds its cache hit/miss counters to the shared ones.
+CACHE_STATS_FLUSH_INTERVAL = 10
+# How long a cache miss waits for the worker already computing the value
+# before computing it too.
+CACHE_MISS_WAIT = 1.0
+
+# Authors with at least this many followers are not fanned out into
+# follower timelines; their posts are merged into the follow feed on read.
+FOLLOW_FEED_FANOUT_THRESHOLD = 1000
+
+# Rendered post cards are keyed by Post.version, so they can live long.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Card thumbnails are built by this many background threads;
+# 0 builds them inline, in the request that saves the image.
+THUMBNAIL_WORKERS = 2
+# A queued thumbnail is not queued again for this many seconds.
+THUMBNAIL_PENDING_TIMEOUT = 60
+# Uploaded images are scaled down to fit this many pixels on each side.
+IMAGE_MAX_SIZE = 2048
+# Unreferenced images modified more recently than this are not deleted
+# yet, since an upload of the same content may be about to reuse them.
+MEDIA_GC_GRACE_SECONDS = 10 * 60
+
+# 'fts5', 'python' or 'auto': FTS5 when its tables exist, else Python.
+SEARCH_BACKEND = 'auto'
+# Search ranks at most this many posts per query.
+SEARCH_MAX_RESULTS = 1000
+
+# With YATUBE_COMMENT_BUFFER=1 new comments are queued in each worker and
+# written in batches: every COMMENT_BUFFER_FLUSH_INTERVAL seconds, or as
+# soon as COMMENT_BUFFER_MAX_SIZE are queued. An interval of 0 starts no
+# background thread and writes full batches inline.
+COMMENT_BUFFER_ENABLED = os.environ.get('YATUBE_COMMENT_BUFFER') == '1'
+COMMENT_BUFFER_FLUSH_INTERVAL = 0.5
+COMMENT_BUFFER_MAX_SIZE = 100
+
+# Share of requests measured in full by RequestMetricsMiddleware; slower
+# requests are logged whether they were sampled or not.
+REQUEST_METRICS_SAMPLE_RATE = float(
+    os.environ.get('YATUBE_METRICS_SAMPLE_RATE', 0.01))
+REQUEST_METRICS_SLOW_MS = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'yatube.metrics.JSONFormatter'},
+    },
+    'handlers': {
+        'requests': {
+            'class': 'yatube.metrics.LogFileHandler',
+            'filename': os.path.join(BASE_DIR, 'logs', 'requests.log'),
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'json',
+        },
+        'comments': {
+            'class': 'yatube.metrics.LogFileHandler',
+            'filename': os.path.join(BASE_DIR, 'logs', 'comments.log'),
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'yatube.requests': {
+            'handlers': ['requests'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'yatube.comments': {
+            'handlers': ['comments'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
+
+# Largest ?limit= of a JSON API page.
+API_MAX_PAGE_SIZE = 100
+# Brotli quality of JSON API responses: 4-5 compress better than gzip
+# at about its speed, the higher levels are for precompressed files.
+API_BROTLI_QUALITY = 5
+# Seconds a JSON API body stays cached under the ETag of its page.
+API_CACHE_TIMEOUT = 60 * 60
@@ -0,0 +1,15 @@
+"""SQLite pragmas applied to every new database connection.
+
+A database whose settings carry ``PRAGMAS`` (see ``DATABASE_PROFILES``)
+gets them executed as soon as Django opens a connection to it. They go
+through the raw DB-API connection, so they are not counted as queries of
+the request that happened to open it.
+"""
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,180 @@
+"""Fingerprinted, precompressed static files served by Django itself.
+
+``collectstatic`` with ``CompressedManifestStaticFilesStorage`` writes every
+file under a name with its content hash, as ``ManifestStaticFilesStorage``
+does, plus ``.gz`` and ``.br`` siblings of the text ones. Templates link
+the hashed names through ``{% static %}``.
+
+``StaticFilesMiddleware`` answers ``STATIC_URL`` requests from
+``STATIC_ROOT`` before the rest of the stack runs: it picks the smallest
+variant the client accepts, serves files up to ``STATIC_MEMORY_MAX_SIZE``
+from memory and streams larger ones with ``FileResponse``, which WSGI
+servers hand to ``sendfile``. Hashed names never change content, so they
+are cached as ``immutable`` for a year.
+"""
+import gzip
+import json
+import mimetypes
+import os
+from collections import namedtuple
+
+import brotli
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico',
+    '.eot', '.ttf', '.otf')
+# Compressed siblings that do not save at least this much are not kept.
+MIN_SAVING = 0.05
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Encoding: suffix of the precompressed file, in order of preference.
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+IDENTITY = 'identity'
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, 9, mtime=0)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as file:
+            data = file.read()
+        for encoding, suffix in ENCODINGS.items():
+            compressed = _compress(data, encoding)
+            if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                with open(self.path(name + suffix), 'wb') as file:
+                    file.write(compressed)
+
+    def stored_name(self, name):
+        # Before the first collectstatic, link the plain name.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+StaticFile = namedtuple(
+    'StaticFile', 'variants content_type immutable mtime')
+
+
+def _hashed_names(root):
+    try:
+        with open(os.path.join(
+                root, ManifestStaticFilesStorage.manifest_name)) as file:
+            return set(json.load(file)['paths'].values())
+    except (FileNotFoundError, ValueError, KeyError):
+        return set()
+
+
+def scan(root):
+    """``{relative URL path: StaticFile}`` of the files under ``root``."""
+    if not root or not os.path.isdir(root):
+        return {}
+    hashed = _hashed_names(root)
+    files = {}
+    for directory, _, names in os.walk(root):
+        for filename in names:
+            if filename.endswith(tuple(ENCODINGS.values())):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            stat = os.stat(path)
+            variants = {IDENTITY: (path, stat.st_size)}
+            for encoding, suffix in ENCODINGS.items():
+                if os.path.exists(path + suffix):
+                    variants[encoding] = (
+                        path + suffix, os.path.getsize(path + suffix))
+            content_type, _ = mimetypes.guess_type(filename)
+            files[name] = StaticFile(
+                variants, content_type or 'application/octet-stream',
+                name in hashed, stat.st_mtime)
+    return files
+
+
+def accepted_encodings(header):
+    """Codings of an ``Accept-Encoding`` header that are not ``q=0``."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """Serve ``STATIC_ROOT`` at ``STATIC_URL`` without a web server.
+
+    The files are indexed when the middleware is created, so files
+    collected afterwards are served after a restart.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.files = (
+            scan(settings.STATIC_ROOT) if self.prefix.startswith('/')
+            else {})
+        self.memory = {}
+
+    def __call__(self, request):
+        if (self.files and request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(self.prefix)):
+            static = self.files.get(request.path_info[len(self.prefix):])
+            if static is not None:
+                return self.serve(request, static)
+        return self.get_response(request)
+
+    def serve(self, request, static):
+        if not static.immutable and not was_modified_since(
+                request.META.get('HTTP_IF_MODIFIED_SINCE'), static.mtime):
+            return HttpResponseNotModified()
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding = next(
+            (encoding for encoding in ENCODINGS
+             if encoding in accepted and encoding in static.variants),
+            IDENTITY)
+        path, size = static.variants[encoding]
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=static.content_type)
+        elif size <= settings.STATIC_MEMORY_MAX_SIZE:
+            if path not in self.memory:
+                with open(path, 'rb') as file:
+                    self.memory[path] = file.read()
+            response = HttpResponse(
+                self.memory[path], content_type=static.content_type)
+        else:
+            response = FileResponse(
+                open(path, 'rb'), content_type=static.content_type)
+        response['Content-Length'] = size
+        response['Last-Modified'] = http_date(static.mtime)
+        response['Cache-Control'] = (
+            IMMUTABLE if static.immutable
+            else f'public, max-age={settings.STATIC_MAX_AGE}')
+        if len(static.variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        if encoding != IDENTITY:
+            response['Content-Encoding'] = encoding
+        return response